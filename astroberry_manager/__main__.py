@@ -1,4 +1,7 @@
-from .main import main
+def run():
+    # import the server on call only, worker processes import this entry point too
+    from .main import main
+    main()
 
 if __name__ == "__main__":
-    main()
+    run()
@@ -23,9 +23,249 @@ the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
 Boston, MA 02110-1301, USA.
 """
 
-import datetime, ephem, numpy
+import time, datetime, logging, ephem, numpy
+from collections import OrderedDict
+from threading import Lock, Event
+from .polar import getLST, getPolarisHourAngle, getPolarisNextTransit
+from .coordinates import getRefraction
+from .ephemeris import fillSearches
+from .workers import runJob
 
-def getAlmanac(socketio, gpstime, latitude, longitude, elevation):
+PLANETS = ['mercury', 'venus', 'mars', 'jupiter', 'saturn', 'uranus', 'neptune']
+
+POLLING = 60 # seconds between almanac broadcasts
+ROOM = 'almanac' # prefix of site rooms, clients of a site get its almanac broadcasts
+
+CACHE_SIZE = 32 # number of sites and time buckets kept
+CACHE_BUCKET = 60 # seconds, matches client refresh rate
+
+CURVE_STEP = 5 # minutes between points of altitude curves
+
+# twilight horizons, searched for the upper limb of the Sun as sunrise and sunset are
+TWILIGHTS = ['-6', '-12', '-18']
+
+logger = logging.getLogger(__name__)
+
+class AlmanacCache(object):
+    """
+    Almanac payloads shared across clients
+    Payloads are keyed on rounded site coordinates and a time bucket (no bucket for payloads
+    valid until their own expiry). Concurrent requests for the same key wait for a single
+    computation. Least recently used entries are evicted.
+    Compute functions return a (payload, expires) tuple, expires being an ephem date or None.
+    Payloads with expiry are valid from the date they were computed for until they expire.
+    """
+    def __init__(self, size=CACHE_SIZE, bucket=CACHE_BUCKET):
+        self.size = size
+        self.bucket = bucket
+        self.entries = OrderedDict()
+        self.pending = {}
+        self.lock = Lock()
+        self.hits = 0
+        self.misses = 0
+        self.waits = 0
+
+    def key(self, observer):
+        key = (
+            round(numpy.degrees(observer.lat), 2),
+            round(numpy.degrees(observer.lon), 2),
+            round(observer.elevation)
+        )
+        if self.bucket:
+            key += (int(float(observer.date) * 86400 // self.bucket),)
+        return key
+
+    def get(self, observer, compute):
+        key = self.key(observer)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and (entry[1] is None or entry[2] <= observer.date < entry[1]):
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            flight = self.pending.get(key)
+            if flight is None:
+                flight = self.pending[key] = [Event(), None]
+                owner = True
+                self.misses += 1
+            else:
+                owner = False
+                self.waits += 1
+
+        if not owner:
+            flight[0].wait()
+            if flight[1] is not None:
+                return flight[1][0]
+            return compute(observer)[0] # owner failed, compute on our own
+
+        try:
+            flight[1] = compute(observer) + (observer.date,)
+            with self.lock:
+                self.entries[key] = flight[1]
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.size:
+                    self.entries.popitem(last=False)
+            return flight[1][0]
+        finally:
+            with self.lock:
+                del self.pending[key]
+            flight[0].set()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'entries': len(self.entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'waits': self.waits
+            }
+
+eventsCache = AlmanacCache(bucket=None)
+positionsCache = AlmanacCache()
+curvesCache = AlmanacCache(size=8, bucket=None)
+
+def getCacheStats():
+    """Return entries, hits, misses and waits of the almanac caches"""
+    return {
+        'events': eventsCache.stats(),
+        'positions': positionsCache.stats(),
+        'curves': curvesCache.stats()
+    }
+
+# Almanac is broadcast for every site with clients, each site has its own room
+almanacSite = None # most recently requested site (latitude, longitude, elevation), default of requests without a site
+almanacSites = {} # site -> last broadcast [events, positions], None before the first one
+siteClients = {} # sid -> site
+siteLock = Lock()
+
+def getAlmanacReports(socketio):
+    while True:
+        for site in getAlmanacSites():
+            try:
+                getAlmanacReportOnce(socketio, site)
+            except Exception as e:
+                # one failing site must not stop reports of the others
+                logger.error("Almanac report for %s failed: %s" % (getSiteRoom(site), e))
+        time.sleep(POLLING - time.time() % POLLING) # align to full minutes
+
+def getAlmanacReportOnce(socketio, site, gpstime=None):
+    if gpstime is None:
+        gpstime = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+
+    home = getObserver(gpstime, *site)
+
+    almanac_events = eventsCache.get(home, offloadAlmanac(computeAlmanacEvents))
+    almanac_positions = positionsCache.get(home, offloadAlmanac(computeAlmanacPositions))
+    almanac = dict(almanac_positions)
+
+    with siteLock:
+        if site not in almanacSites:
+            return # no clients left
+        last = almanacSites[site]
+        almanacSites[site] = [almanac_events, almanac_positions]
+
+    # send daily events only if subscribers do not have them yet
+    if last is None or last[0]['almanac_events'] != almanac_events['almanac_events']:
+        almanac.update(almanac_events)
+
+    # emit celestial data to all subscribers of the site
+    socketio.emit('almanac', almanac, to=getSiteRoom(site))
+    #print("Almanac data published")
+
+def getSite(latitude, longitude, elevation):
+    return (round(latitude, 2), round(longitude, 2), round(elevation))
+
+def getSiteRoom(site):
+    return "%s:%s,%s,%s" % ((ROOM,) + tuple(site))
+
+def getAlmanacSite():
+    return almanacSite
+
+def getAlmanacSites():
+    with siteLock:
+        return list(almanacSites)
+
+def getAlmanacRooms():
+    """Return (site, room) of every site with clients"""
+    return [(site, getSiteRoom(site)) for site in getAlmanacSites()]
+
+def setAlmanacSite(sid, latitude, longitude, elevation):
+    """Move client to a site, returns room of the site and room of its previous site or None"""
+    global almanacSite
+
+    site = getSite(latitude, longitude, elevation)
+    with siteLock:
+        previous = siteClients.get(sid)
+        siteClients[sid] = site
+        almanacSites.setdefault(site, None)
+        if previous is not None and previous != site and previous not in siteClients.values():
+            del almanacSites[previous]
+        almanacSite = site
+
+    return getSiteRoom(site), getSiteRoom(previous) if previous not in (None, site) else None
+
+def removeAlmanacSite(sid):
+    with siteLock:
+        site = siteClients.pop(sid, None)
+        if site is not None and site not in siteClients.values():
+            del almanacSites[site]
+
+def getAlmanac(socketio, gpstime, latitude, longitude, elevation, events=None, to=None):
+    """
+    Send almanac of a site to a client
+    The first client of a site triggers immediate broadcast to the site, others receive
+    the last almanac broadcast to it.
+    """
+    site = getSite(latitude, longitude, elevation)
+    with siteLock:
+        last = almanacSites.get(site)
+
+    if last is None:
+        getAlmanacReportOnce(socketio, site, gpstime)
+    else:
+        emitAlmanac(socketio, to, site, events)
+
+def emitAlmanac(socketio, to, site, events=None):
+    """Send last almanac broadcast to a site to a single client, including daily events unless it has them"""
+    with siteLock:
+        last = almanacSites.get(site)
+    if last is None:
+        return
+
+    almanac = dict(last[1])
+    if events != last[0]['almanac_events']:
+        almanac.update(last[0])
+
+    socketio.emit('almanac', almanac, to=to)
+
+def getAlmanacCurve(socketio, gpstime=None, latitude=None, longitude=None, elevation=None, to=None):
+    """Send tonight's altitude curves for a site, the active site if not given"""
+    try:
+        curves = getAlmanacCurveOnce(gpstime, latitude, longitude, elevation)
+    except ValueError:
+        return
+    if curves:
+        socketio.emit('almanac_curve', curves, to=to)
+
+def getAlmanacCurveOnce(gpstime=None, latitude=None, longitude=None, elevation=None):
+    """Return tonight's altitude curves for a site, the active site if not given. Raises ValueError on invalid request."""
+    if latitude is None or longitude is None:
+        if almanacSite is None:
+            return
+        latitude, longitude, elevation = almanacSite
+
+    if gpstime is None:
+        gpstime = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+
+    try:
+        home = getObserver(gpstime, float(latitude), float(longitude), float(elevation or 0))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid almanac curve site or time")
+    return curvesCache.get(home, offloadAlmanac(computeAlmanacCurves))
+
+def getObserver(gpstime, latitude, longitude, elevation):
     t = datetime.datetime.strptime(str(gpstime), '%Y-%m-%dT%H:%M:%S.%f%z')
     t = t.replace(tzinfo=datetime.timezone.utc) #Convert it to an aware datetime object in UTC time.
 
@@ -42,141 +282,285 @@ def getAlmanac(socketio, gpstime, latitude, longitude, elevation):
     home.elevation = float(alt)
     home.date = t
 
-    # get polaris data
-    polaris_data = getPolarisData(home)
+    return home
+
+def offloadAlmanac(compute):
+    """Run compute function of the almanac in a worker process, observers are passed by value"""
+    def offloaded(home):
+        return runJob(computeAlmanacJob, compute, float(home.date), float(home.lat), float(home.lon), home.elevation)
+    return offloaded
+
+def computeAlmanacJob(compute, date, latitude, longitude, elevation):
+    home = ephem.Observer()
+    home.lat = latitude # radians
+    home.lon = longitude # radians
+    home.elevation = elevation
+    home.date = date
+    return compute(home)
+
+def getBodies(observer):
+    bodies = {'moon': ephem.Moon(observer), 'sun': ephem.Sun(observer)}
+    for planet in PLANETS:
+        bodies[planet] = getattr(ephem, planet.capitalize())(observer)
+    return bodies
+
+def computeAlmanac(home):
+    """
+    Compute complete almanac in a single pass
+    Positions are read before rise/transit/set searches recompute the bodies at other dates.
+    """
+    bodies = getBodies(home)
+    almanac = computeAlmanacPositions(home, bodies)[0]
+    almanac.update(computeAlmanacEvents(home, bodies)[0])
+    return almanac
+
+def computeAlmanacPositions(home, bodies=None):
+    """
+    Compute fast changing part of the almanac
+    Costs a single compute() of every body.
+    """
+    if bodies is None:
+        bodies = getBodies(home)
+
+    almanac = {
+    'polaris_hour_angle': "%.2f" % getPolarisHourAngle(home),
+    'moon_light': "%.1f" % bodies['moon'].phase
+    }
+
+    for name, body in bodies.items():
+        almanac[name + '_az'] = "%.2f°" % numpy.degrees(body.az)
+        almanac[name + '_alt'] = "%.2f°" % numpy.degrees(body.alt)
+        if name in ('moon', 'sun'):
+            almanac[name + '_ra'] = "%.2f" % numpy.degrees(body.ra)
+            almanac[name + '_dec'] = "%.2f" % numpy.degrees(body.dec)
+
+    return almanac, None
 
-    # emit celestial data
-    socketio.emit('almanac', {
+def computeAlmanacEvents(home, bodies=None):
+    """
+    Compute daily events of the almanac
+    Events are valid until local midnight or until the earliest upcoming rise, transit
+    or set of any body, whichever comes first, since rise/transit/set reported for a body
+    depend on which of them already passed.
+    """
+    if bodies is None:
+        bodies = getBodies(home)
+
+    t = home.date
+    searches = {}
+
+    # rise/transit/set of the Sun and the Moon from precomputed ephemeris of the site, if any
+    fillSearches(home, searches)
+
+    polaris_transit = getPolarisNextTransit(home)
+    next_new = getNextLunation(t, 'New')
+    next_full = getNextLunation(t, 'Full')
+    next_equinox = ephem.next_equinox(t)
+    next_solstice = ephem.next_solstice(t)
+
+    almanac = {
     'latitude': "%.2f" % numpy.degrees(home.lat),
     'longitude': "%.2f" % numpy.degrees(home.lon),
     'elevation': "%.2f" % home.elevation,
-    'polaris_hour_angle': "%.2f" % polaris_data[0],
-    'polaris_next_transit': "%s" % polaris_data[1],
+    'polaris_next_transit': "%s" % (ephem.localtime(polaris_transit).strftime("%H:%M:%S") if polaris_transit else '-'),
     'moon_phase': "%s" % getMoonPhase(home),
-    'moon_light': "%.1f" % ephem.Moon(home).phase,
-    'moon_rise': "%s" % getBodyPositions(home,ephem.Moon(home))[0],
-    'moon_transit': "%s" % getBodyPositions(home,ephem.Moon(home))[1],
-    'moon_set': "%s" % getBodyPositions(home,ephem.Moon(home))[2],
-    'moon_az': "%.2f°" % numpy.degrees(ephem.Moon(home).az),
-    'moon_alt': "%.2f°" % numpy.degrees(ephem.Moon(home).alt),
-    'moon_ra': "%.2f" % numpy.degrees(ephem.Moon(home).ra),
-    'moon_dec': "%.2f" % numpy.degrees(ephem.Moon(home).dec),
-    'moon_new': "%s" % ephem.localtime(ephem.next_new_moon(t)).strftime("%Y-%m-%d %H:%M:%S"),
-    'moon_full': "%s" % ephem.localtime(ephem.next_full_moon(t)).strftime("%Y-%m-%d %H:%M:%S"),
-    'sun_at_start': getSunTwilights(home)[2][0],
-    'sun_ct_start': getSunTwilights(home)[0][0],
-    'sun_rise': "%s" % getBodyPositions(home,ephem.Sun(home))[0],
-    'sun_transit': "%s" % getBodyPositions(home,ephem.Sun(home))[1],
-    'sun_set': "%s" % getBodyPositions(home,ephem.Sun(home))[2],
-    'sun_ct_end': getSunTwilights(home)[0][1],
-    'sun_at_end': getSunTwilights(home)[2][1],
-    'sun_az': "%.2f°" % numpy.degrees(ephem.Sun(home).az),
-    'sun_alt': "%.2f°" % numpy.degrees(ephem.Sun(home).alt),
-    'sun_ra': "%.2f" % numpy.degrees(ephem.Sun(home).ra),
-    'sun_dec': "%.2f" % numpy.degrees(ephem.Sun(home).dec),
-    'sun_equinox': "%s" % ephem.localtime(ephem.next_equinox(t)).strftime("%Y-%m-%d %H:%M:%S"),
-    'sun_solstice': "%s" % ephem.localtime(ephem.next_solstice(t)).strftime("%Y-%m-%d %H:%M:%S"),
-    'mercury_rise': "%s" % getBodyPositions(home,ephem.Mercury(home))[0],
-    'mercury_transit': "%s" % getBodyPositions(home,ephem.Mercury(home))[1],
-    'mercury_set': "%s" % getBodyPositions(home,ephem.Mercury(home))[2],
-    'mercury_az': "%.2f°" % numpy.degrees(ephem.Mercury(home).az),
-    'mercury_alt': "%.2f°" % numpy.degrees(ephem.Mercury(home).alt),
-    'venus_rise': "%s" % getBodyPositions(home,ephem.Venus(home))[0],
-    'venus_transit': "%s" % getBodyPositions(home,ephem.Venus(home))[1],
-    'venus_set': "%s" % getBodyPositions(home,ephem.Venus(home))[2],
-    'venus_az': "%.2f°" % numpy.degrees(ephem.Venus(home).az),
-    'venus_alt': "%.2f°" % numpy.degrees(ephem.Venus(home).alt),
-    'mars_rise': "%s" % getBodyPositions(home,ephem.Mars(home))[0],
-    'mars_transit': "%s" % getBodyPositions(home,ephem.Mars(home))[1],
-    'mars_set': "%s" % getBodyPositions(home,ephem.Mars(home))[2],
-    'mars_az': "%.2f°" % numpy.degrees(ephem.Mars(home).az),
-    'mars_alt': "%.2f°" % numpy.degrees(ephem.Mars(home).alt),
-    'jupiter_rise': "%s" % getBodyPositions(home,ephem.Jupiter(home))[0],
-    'jupiter_transit': "%s" % getBodyPositions(home,ephem.Jupiter(home))[1],
-    'jupiter_set': "%s" % getBodyPositions(home,ephem.Jupiter(home))[2],
-    'jupiter_az': "%.2f°" % numpy.degrees(ephem.Jupiter(home).az),
-    'jupiter_alt': "%.2f°" % numpy.degrees(ephem.Jupiter(home).alt),
-    'saturn_rise': "%s" % getBodyPositions(home,ephem.Saturn(home))[0],
-    'saturn_transit': "%s" % getBodyPositions(home,ephem.Saturn(home))[1],
-    'saturn_set': "%s" % getBodyPositions(home,ephem.Saturn(home))[2],
-    'saturn_az': "%.2f°" % numpy.degrees(ephem.Saturn(home).az),
-    'saturn_alt': "%.2f°" % numpy.degrees(ephem.Saturn(home).alt),
-    'uranus_rise': "%s" % getBodyPositions(home,ephem.Uranus(home))[0],
-    'uranus_transit': "%s" % getBodyPositions(home,ephem.Uranus(home))[1],
-    'uranus_set': "%s" % getBodyPositions(home,ephem.Uranus(home))[2],
-    'uranus_az': "%.2f°" % numpy.degrees(ephem.Uranus(home).az),
-    'uranus_alt': "%.2f°" % numpy.degrees(ephem.Uranus(home).alt),
-    'neptune_rise': "%s" % getBodyPositions(home,ephem.Neptune(home))[0],
-    'neptune_transit': "%s" % getBodyPositions(home,ephem.Neptune(home))[1],
-    'neptune_set': "%s" % getBodyPositions(home,ephem.Neptune(home))[2],
-    'neptune_az': "%.2f°" % numpy.degrees(ephem.Neptune(home).az),
-    'neptune_alt': "%.2f°" % numpy.degrees(ephem.Neptune(home).alt)
+    'moon_new': "%s" % ephem.localtime(next_new).strftime("%Y-%m-%d %H:%M:%S"),
+    'moon_full': "%s" % ephem.localtime(next_full).strftime("%Y-%m-%d %H:%M:%S"),
+    'sun_equinox': "%s" % ephem.localtime(next_equinox).strftime("%Y-%m-%d %H:%M:%S"),
+    'sun_solstice': "%s" % ephem.localtime(next_solstice).strftime("%Y-%m-%d %H:%M:%S")
+    }
+
+    for name, body in bodies.items():
+        positions = getBodyPositions(home, body, searches)
+        almanac[name + '_rise'] = "%s" % positions[0]
+        almanac[name + '_transit'] = "%s" % positions[1]
+        almanac[name + '_set'] = "%s" % positions[2]
+
+    twilights = getSunTwilights(home, bodies['sun'], searches)
+    almanac.update({
+    'sun_at_start': twilights[2][0],
+    'sun_ct_start': twilights[0][0],
+    'sun_ct_end': twilights[0][1],
+    'sun_at_end': twilights[2][1]
     })
-    #print("Almanac data published")
+
+    # any upcoming event passing changes which events are reported, make sure all are known
+    horizon = home.horizon
+    for twi in [None] + TWILIGHTS:
+        if twi is not None:
+            home.horizon = twi
+        for name, body in bodies.items():
+            if twi is None or name == 'sun':
+                findNextEvents(home, body, searches)
+    home.horizon = horizon
+
+    # valid until local midnight or the next event, whichever comes first
+    today = ephem.localtime(t).date()
+    midnight = datetime.datetime.combine(today + datetime.timedelta(days=1), datetime.time())
+    expires = ephem.Date(datetime.datetime.fromtimestamp(midnight.timestamp(), datetime.timezone.utc))
+    for event in [polaris_transit, next_new, next_full, next_equinox, next_solstice] + list(searches.values()):
+        if event is not None and t < event < expires:
+            expires = ephem.Date(event)
+
+    almanac['almanac_events'] = "%s,%s,%s@%.6f" % (almanac['latitude'], almanac['longitude'], almanac['elevation'], t)
+
+    return almanac, expires
+
+def computeAlmanacCurves(home, step=CURVE_STEP):
+    """
+    Compute altitude and azimuth of the Sun, the Moon and planets across tonight
+    Tonight spans local noon to local noon. Apparent topocentric coordinates of every body
+    are computed hourly and interpolated to the time grid, then sidereal time and the
+    alt/az transform are evaluated for the whole grid at once.
+    """
+    start = getNightStart(home)
+
+    grid = float(start) + numpy.arange(0, 1440 + step, step) / 1440.0
+    knots = float(start) + numpy.arange(0, 26) / 24.0
+
+    # local sidereal time over the grid
+    lst = numpy.radians(getLST(grid, numpy.degrees(home.lon)))
+
+    lat = float(home.lat)
+    observer = home.copy()
+
+    curves = {
+        'start': "%s" % ephem.localtime(start).strftime("%Y-%m-%d %H:%M:%S"),
+        'step': step,
+        'time': [ephem.localtime(ephem.Date(t)).strftime("%H:%M") for t in grid]
+    }
+
+    for name in ['sun', 'moon'] + PLANETS:
+        body = getattr(ephem, name.capitalize())()
+        ra = numpy.empty(len(knots))
+        dec = numpy.empty(len(knots))
+        for i, k in enumerate(knots):
+            observer.date = k
+            body.compute(observer)
+            ra[i] = body.ra
+            dec[i] = body.dec
+
+        ra = numpy.interp(grid, knots, numpy.unwrap(ra))
+        dec = numpy.interp(grid, knots, dec)
+        ha = lst - ra
+
+        alt = numpy.arcsin(numpy.sin(lat) * numpy.sin(dec) + numpy.cos(lat) * numpy.cos(dec) * numpy.cos(ha))
+        az = numpy.arctan2(-numpy.cos(dec) * numpy.sin(ha), numpy.sin(dec) * numpy.cos(lat) - numpy.cos(dec) * numpy.sin(lat) * numpy.cos(ha))
+
+        # apparent altitude, refracted as target coordinates
+        alt = numpy.degrees(alt)
+        alt = alt + getRefraction(alt)
+
+        curves[name] = {
+            'alt': numpy.round(alt, 2).tolist(),
+            'az': numpy.round(numpy.degrees(az) % 360.0, 2).tolist()
+        }
+
+    return curves, ephem.Date(grid[-1])
+
+def getNightStart(observer):
+    """Return local noon starting tonight, yesterday's noon before midday"""
+    now = ephem.localtime(observer.date)
+    night = now.date() if now.hour >= 12 else now.date() - datetime.timedelta(days=1)
+    noon = datetime.datetime.combine(night, datetime.time(12))
+    return ephem.Date(datetime.datetime.fromtimestamp(noon.timestamp(), datetime.timezone.utc))
 
 def getMoonPhase(observer):
     target_date_utc = observer.date
     target_date_local = ephem.localtime( target_date_utc ).date()
-    next_full = ephem.localtime( ephem.next_full_moon(target_date_utc) ).date()
-    next_new = ephem.localtime( ephem.next_new_moon(target_date_utc) ).date()
-    next_last_quarter = ephem.localtime( ephem.next_last_quarter_moon(target_date_utc) ).date()
-    next_first_quarter = ephem.localtime( ephem.next_first_quarter_moon(target_date_utc) ).date()
-    previous_full = ephem.localtime( ephem.previous_full_moon(target_date_utc) ).date()
-    previous_new = ephem.localtime( ephem.previous_new_moon(target_date_utc) ).date()
-    previous_last_quarter = ephem.localtime( ephem.previous_last_quarter_moon(target_date_utc) ).date()
-    previous_first_quarter = ephem.localtime( ephem.previous_first_quarter_moon(target_date_utc) ).date()
-
-    if target_date_local in (next_full, previous_full):
-        return 'Full'
-    elif target_date_local in (next_new, previous_new):
-        return 'New'
-    elif target_date_local in (next_first_quarter, previous_first_quarter):
-        return 'First Quarter'
-    elif target_date_local in (next_last_quarter, previous_last_quarter):
-        return 'Last Quarter'
-    elif previous_new < next_first_quarter < next_full < next_last_quarter < next_new:
+
+    # lunation event today
+    for date, phase in getLunations(target_date_utc):
+        if abs(date - target_date_utc) < 2 and ephem.localtime( date ).date() == target_date_local:
+            return phase
+
+    # otherwise classify by Moon-Sun elongation measured in ecliptic longitude, as lunations are
+    sun = ephem.Sun(target_date_utc)
+    moon = ephem.Moon(target_date_utc)
+    elongation = numpy.degrees((ephem.Ecliptic(moon).lon - ephem.Ecliptic(sun).lon) % (2 * numpy.pi))
+
+    if elongation < 90:
         return 'Waxing Crescent'
-    elif previous_first_quarter < next_full < next_last_quarter < next_new < next_first_quarter:
+    elif elongation < 180:
         return 'Waxing Gibbous'
-    elif previous_full < next_last_quarter < next_new < next_first_quarter < next_full:
+    elif elongation < 270:
         return 'Waning Gibbous'
-    elif previous_last_quarter < next_new < next_first_quarter < next_full < next_last_quarter:
+    else:
         return 'Waning Crescent'
 
-def getBodyPositions(observer, body):
+lunations = [] # lunation table [(date, phase)] spanning three lunations
+
+def getLunations(date):
+    """Return lunation table holding the day before date and next lunation of each phase"""
+    global lunations
+
+    table = lunations
+    if not table or table[0][0] > date - 1 or table[-1][0] < date + 30:
+        searches = [
+            (ephem.next_first_quarter_moon, 'First Quarter'),
+            (ephem.next_full_moon, 'Full'),
+            (ephem.next_last_quarter_moon, 'Last Quarter'),
+            (ephem.next_new_moon, 'New')
+        ]
+        d = ephem.previous_new_moon(date - 1)
+        table = [(d, 'New')]
+        for i in range(12):
+            d = searches[i % 4][0](d)
+            table.append((d, searches[i % 4][1]))
+        lunations = table
+
+    return table
+
+def getNextLunation(date, phase):
+    for d, p in getLunations(date):
+        if p == phase and d > date:
+            return d
+
+def getBodyPositions(observer, body, searches=None):
     positions = []
 
+    # resolve each rise/transit/set search once and reuse it, optionally collecting them in searches
+    if searches is None:
+        searches = {}
+
+    def event(search):
+        return findEvent(observer, body, search, searches)
+
+    today = ephem.localtime(observer.date).date()
+
     # test for always below horizon or always above horizon
     try:
-        if ephem.localtime(observer.previous_rising(body)).date() == ephem.localtime(observer.date).date() and observer.previous_rising(body) < observer.previous_transit(body) < observer.previous_setting(body) < observer.date:
-            positions.append(observer.previous_rising(body))
-            positions.append(observer.previous_transit(body))
-            positions.append(observer.previous_setting(body))
-        elif ephem.localtime(observer.previous_rising(body)).date() == ephem.localtime(observer.date).date() and observer.previous_rising(body) < observer.previous_transit(body) < observer.date < observer.next_setting(body):
-            positions.append(observer.previous_rising(body))
-            positions.append(observer.previous_transit(body))
-            positions.append(observer.next_setting(body))
-        elif ephem.localtime(observer.previous_rising(body)).date() == ephem.localtime(observer.date).date() and observer.previous_rising(body) < observer.date < observer.next_transit(body) < observer.next_setting(body):
-            positions.append(observer.previous_rising(body))
-            positions.append(observer.next_transit(body))
-            positions.append(observer.next_setting(body))
-        elif ephem.localtime(observer.previous_rising(body)).date() == ephem.localtime(observer.date).date() and  observer.date < observer.next_rising(body) < observer.next_transit(body) < observer.next_setting(body):
-            positions.append(observer.next_rising(body))
-            positions.append(observer.next_transit(body))
-            positions.append(observer.next_setting(body))
+        risen_today = ephem.localtime(event('previous_rising')).date() == today
+        if risen_today and event('previous_rising') < event('previous_transit') < event('previous_setting') < observer.date:
+            positions.append(event('previous_rising'))
+            positions.append(event('previous_transit'))
+            positions.append(event('previous_setting'))
+        elif risen_today and event('previous_rising') < event('previous_transit') < observer.date < event('next_setting'):
+            positions.append(event('previous_rising'))
+            positions.append(event('previous_transit'))
+            positions.append(event('next_setting'))
+        elif risen_today and event('previous_rising') < observer.date < event('next_transit') < event('next_setting'):
+            positions.append(event('previous_rising'))
+            positions.append(event('next_transit'))
+            positions.append(event('next_setting'))
+        elif risen_today and observer.date < event('next_rising') < event('next_transit') < event('next_setting'):
+            positions.append(event('next_rising'))
+            positions.append(event('next_transit'))
+            positions.append(event('next_setting'))
         else:
-            positions.append(observer.next_rising(body))
-            positions.append(observer.next_transit(body))
-            positions.append(observer.next_setting(body))
+            positions.append(event('next_rising'))
+            positions.append(event('next_transit'))
+            positions.append(event('next_setting'))
     except (ephem.NeverUpError, ephem.AlwaysUpError):
         try:
-            if ephem.localtime(observer.previous_transit(body)).date() == ephem.localtime(observer.date).date() and observer.previous_transit(body) < observer.date:
+            transited_today = ephem.localtime(event('previous_transit')).date() == today
+            if transited_today and event('previous_transit') < observer.date:
                 positions.append('-')
-                positions.append(observer.previous_transit(body))
+                positions.append(event('previous_transit'))
                 positions.append('-')
-            elif ephem.localtime(observer.previous_transit(body)).date() == ephem.localtime(observer.date).date() and observer.next_transit(body) > observer.date:
+            elif transited_today and event('next_transit') > observer.date:
                 positions.append('-')
-                positions.append(observer.next_transit(body))
+                positions.append(event('next_transit'))
                 positions.append('-')
             else:
                 positions.append('-')
@@ -196,7 +580,20 @@ def getBodyPositions(observer, body):
 
     return positions
 
-def getSunTwilights(observer):
+def findEvent(observer, body, search, searches):
+    key = (body.name, str(observer.horizon), search)
+    if key not in searches:
+        searches[key] = getattr(observer, search)(body)
+    return searches[key]
+
+def findNextEvents(observer, body, searches):
+    for search in ('next_rising', 'next_transit', 'next_setting'):
+        try:
+            findEvent(observer, body, search, searches)
+        except (ephem.NeverUpError, ephem.AlwaysUpError):
+            pass
+
+def getSunTwilights(observer, sun=None, searches=None):
     results = []
 
     """
@@ -218,16 +615,17 @@ def getSunTwilights(observer):
     getSunTwilights(home)[2][1]   -   astronomical twilight start
     """
 
+    # reuse the Sun computed by the caller
+    if sun is None:
+        sun = ephem.Sun(observer)
+
     # remember entry observer horizon
     observer_horizon = observer.horizon
 
-    # twilights, their horizons and whether to use the centre of the Sun or not
-    twilights = [('-6', True), ('-12', True), ('-18', True)]
-
-    for twi in twilights:
-        observer.horizon = twi[0]
+    for twi in TWILIGHTS:
+        observer.horizon = twi
         try:
-            rising_setting = getBodyPositions(observer,ephem.Sun(observer))
+            rising_setting = getBodyPositions(observer, sun, searches)
             results.append((rising_setting[0], rising_setting[2]))
         except ephem.AlwaysUpError:
             results.append(('n/a', 'n/a'))
@@ -236,50 +634,3 @@ def getSunTwilights(observer):
     observer.horizon = observer_horizon
 
     return results
-
-def getPolarisData(observer):
-    polaris_data = []
-
-    """
-    lst = 100.46 + 0.985647 * d + lon + 15 * ut [based on http://www.stargazing.net/kepler/altaz.html]
-    d - the days from J2000 (1200 hrs UT on Jan 1st 2000 AD), including the fraction of a day
-    lon - your longitude in decimal degrees, East positive
-    ut - the universal time in decimal hours
-    """
-
-    j2000 = ephem.Date('2000/01/01 12:00:00')
-    d = observer.date - j2000
-
-    lon = numpy.rad2deg(float(observer.lon))
-
-    utstr = observer.date.datetime().strftime("%H:%M:%S")
-    ut = float(utstr.split(":")[0]) + float(utstr.split(":")[1])/60 + float(utstr.split(":")[2])/3600
-
-    lst = 100.46 + 0.985647 * d + lon + 15 * ut
-    lst = lst - int(lst / 360) * 360
-
-    polaris = ephem.readdb("Polaris,f|M|F7,2:31:49.095,89:15:50.79,2.02,2000")
-    polaris.compute()
-
-    polaris_ra_deg = numpy.rad2deg(float(polaris._ra))
-
-    # polaris Hour Angle = LST - RA Polaris [expressed in degrees or 15*(h+m/60+s/3600)]
-    pha = lst - polaris_ra_deg
-
-    # normalize
-    if pha < 0:
-        pha += 360
-    elif pha > 360:
-        pha -= 360
-
-    # append polaris hour angle
-    polaris_data.append(pha)
-
-    # append polaris next transit
-    try:
-        pnt = ephem.localtime(observer.next_transit(polaris)).strftime("%H:%M:%S")
-        polaris_data.append(pnt)
-    except (ephem.NeverUpError, ephem.AlwaysUpError):
-        polaris_data.append('-')
-
-    return polaris_data
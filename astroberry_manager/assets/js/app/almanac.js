@@ -32,10 +32,17 @@ function loadAlmanac() {
     console.log("Almanac loaded");
 }
 
+var almanacData = {}; // daily events and latest positions
+
 function updateAlmanac(data) {
     if (data === undefined || data === null)
         return;
 
+    // daily events are sent only when they change, merge them with positions
+    data = Object.assign(almanacData, data);
+    if (data.almanac_events === undefined)
+        return;
+
     // Moon
     $("#moon_phase_name").html(data.moon_phase);
     $("#moon_light").html(data.moon_light + "%");
@@ -120,12 +127,7 @@ function updateAlmanac(data) {
     toggleAltTrend("neptune", data.neptune_alt); // set alt trend
     $("#neptune_alt").html(data.neptune_alt);
 
-    /* Format polaris hour angle for display */
-    var pha = data.polaris_hour_angle;
-    $("#pha").html(deg2hms(pha));
-
-    /* Set polaris marker */
-    getReticle(pha * Math.PI / 180);
+    updatePolaris(data);
 
     /* Compute polaris cardinal positions */
     var pnt = data.polaris_next_transit.split(':');
@@ -180,6 +182,18 @@ function updateAlmanac(data) {
     //console.log("Almanac updated");
 }
 
+function updatePolaris(data) {
+    if (data === undefined || data === null || data.polaris_hour_angle === undefined)
+        return;
+
+    /* Format polaris hour angle for display */
+    var pha = data.polaris_hour_angle;
+    $("#pha").html(deg2hms(pha));
+
+    /* Set polaris marker */
+    getReticle(pha * Math.PI / 180);
+}
+
 function getReticle(pha_angle) {
     pha_angle = pha_angle ? pha_angle : 0;
     var width = parseInt($("#polaris-reticle").width());
@@ -368,8 +382,9 @@ function requestAlmanac() {
     data['latitude'] = parseFloat(geoLocation.latitude);
     data['longitude'] = parseFloat(geoLocation.longitude);
     data['altitude'] = parseFloat(geoLocation.altitude);
+    data['events'] = almanacData.almanac_events;
 
-    if (!data) return;
+    if (isNaN(data['latitude']) || isNaN(data['longitude']) || isNaN(data['altitude'])) return; // location not known yet
 
     socket.timeout(5000).emit("almanac", data, (err) => {
         if (err) {
@@ -491,5 +506,6 @@ export {
     loadAlmanac,
     requestAlmanac,
     updateAlmanac,
+    updatePolaris,
     almanacEvents
 };
@@ -102,9 +102,15 @@ function updateTelescope(data) {
   if (data === undefined || data.TELESCOPE === undefined)
     return;
 
-  var telescopeNames = Object.keys(data.TELESCOPE); // get all active telescopes
+  if (telescopeCoords.device === undefined) // use the first telescope unless one was selected
+    telescopeCoords.device = Object.keys(data.TELESCOPE)[0];
 
-  const telescopeId = 0; // use the first telescope ONLY
+  var telescopeNames = [telescopeCoords.device];
+
+  const telescopeId = 0; // use the selected telescope ONLY
+
+  if (data.TELESCOPE[telescopeNames[telescopeId]] === undefined)
+    return;
 
   if (data.TELESCOPE[telescopeNames[telescopeId]]['EQUATORIAL_EOD_COORD']) {
     // remember last coordinates
@@ -169,6 +175,30 @@ function updateTelescope(data) {
   }
 }
 
+function updateTelescopeDevices(devices) {
+  // keep selected telescope while it is available
+  var telescopes = devices.TELESCOPE ? devices.TELESCOPE : [];
+  if ($.inArray(telescopeCoords.device, telescopes) === -1)
+    telescopeCoords.device = telescopes.length ? telescopes[0] : undefined;
+
+  // let the user pick the mount when there is more than one
+  var select = $("#starchart_telescope_select");
+  select.empty();
+  $.each(telescopes, function (i, device) {
+    select.append($("<option>").val(device).text(device));
+  });
+  select.val(telescopeCoords.device);
+  $("#starchart_telescope_selector").toggle(telescopes.length > 1);
+}
+
+function selectTelescope(device) {
+  telescopeCoords.device = device;
+}
+
+function getTelescopeDevice() {
+  return telescopeCoords.device;
+}
+
 function getAzAlt(ra, dec) {
   if (ra === undefined || ra === null || dec === undefined || dec === null)
     return;
@@ -326,7 +356,7 @@ function setTelescopeCoordinates(ra, dec) {
   if (ra < 0 || ra > 360) return;
   if (dec < -90 || dec > 90) return;
 
-  var coordinates = { ra: ra, dec: dec };
+  var coordinates = { ra: ra, dec: dec, device: telescopeCoords.device };
 
   socket.timeout(5000).emit("equipment", coordinates, (err) => {
     if (err) {
@@ -588,6 +618,10 @@ function starchartEvents() {
     telescopeCoords.chartlock = !telescopeCoords.chartlock;
   });
 
+  $("#starchart_telescope_select").on("change", function () {
+    selectTelescope($(this).val());
+  });
+
   $("#celestial-map-icon").on("click", function () {
     $("#celestial-form").toggle();
   });
@@ -659,6 +693,8 @@ export {
   requestStarChart,
   updateStarChartLocation,
   updateTelescope,
+  updateTelescopeDevices,
+  getTelescopeDevice,
   centerOnCoords,
   centerOnSolarObject,
   updateTelescopeStatusIcon,
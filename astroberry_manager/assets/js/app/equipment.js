@@ -30,6 +30,11 @@ const deviceGroups = ["GENERAL", "TELESCOPE", "CCD", "GUIDER", "FOCUSER", "FILTE
 
 const indiwebUrl = location.protocol + '//' + location.hostname;
 
+var equipmentState = {}; // last known properties of devices, keyed on device and property name
+var equipmentDevices = {}; // names of devices of every type
+var previewEnabled = false; // camera previews requested
+var loggedMessages = null; // [oldest, newest] id of INDI messages logged, history is sent again on every connect
+
 /* ================================================== */
 /*          Communicate with INDI API
 /* ================================================== */
@@ -590,24 +595,153 @@ function restartDriver(label) {
 /*              Process INDI server data
 /* ================================================== */
 
+function mergeEquipment(data) {
+    // merge full properties and deltas into equipment state, return data with full properties
+    if (data === undefined || data === null)
+        return data;
+
+    if (data.disconnect) {
+        equipmentState = {};
+        return data;
+    }
+
+    if ('equipment' in data) {
+        $.each(data['equipment'], function (type, devices) {
+            $.each(devices, function (device, properties) {
+                $.each(properties, function (name, elements) {
+                    if ($.inArray(name, ["GROUP", "LABEL", "TYPE", "STATE", "PERM", "VERSION"]) !== -1) return;
+                    if (equipmentState[device] === undefined) equipmentState[device] = {};
+                    equipmentState[device][name] = {'type': type, 'properties': properties};
+                });
+            });
+        });
+        return data;
+    }
+
+    if ('delta' in data) {
+        var delta = data['delta'];
+        var device = equipmentState[delta.DEVICE];
+        var entry = device ? device[delta.PROPERTY] : undefined;
+
+        var base = delta.BASE !== undefined ? delta.BASE : delta.VERSION - 1; // coalesced deltas start at BASE
+        if (entry === undefined || base > entry.properties.VERSION) {
+            // missed full property or a delta, request full property
+            socket.emit('equipment_resync', {'device': delta.DEVICE, 'property': delta.PROPERTY});
+            return null;
+        }
+
+        if (delta.VERSION <= entry.properties.VERSION)
+            return null; // already have it
+
+        $.each(delta.VALUES, function (element, value) {
+            entry.properties[delta.PROPERTY][element][0] = value;
+        });
+        entry.properties.STATE = delta.STATE;
+        entry.properties.VERSION = delta.VERSION;
+
+        var equipment = {};
+        equipment[entry.type] = {};
+        equipment[entry.type][delta.DEVICE] = entry.properties;
+        return {'equipment': equipment};
+    }
+
+    return data;
+}
+
 function updateEquipment(data) {
     // don't process incomplete data
     if (data === undefined || data === null)
         return;
 
+    if ('connection' in data) {
+        var connection = data['connection'];
+        if (connection.state == "waiting")
+            console.log("INDI server unavailable, retry " + connection.retries + " at " + connection.next_retry);
+    }
+
+    if ('devices' in data) {
+        equipmentDevices = data['devices'];
+        if (previewEnabled) requestPreview(true); // cameras added since
+    }
+
     if ('equipment' in data) {
         data = data['equipment'];
         if (data === undefined || data == null) return;
         //markActiveMultiple(Object.keys(data));
     }
 
+    if ('messages' in data) { // message history, oldest first
+        var logged = loggedMessages ? loggedMessages.slice() : null; // ids logged before this page
+        var messages = data['messages'];
+        var older = logged !== null && (messages.length == 0 || messages[messages.length - 1].id < logged[0]); // page requested by load older
+        if (older) messages = messages.slice().reverse(); // prepended newest first
+        $.each(messages, function (i, message) {
+            if (isMessageLogged(message.id, logged)) return;
+            setMessageLogged(message.id);
+            syslogPrint(message.timestamp + ": [" + message.severity + "] " + message.device + ": " + message.text, getMessageLevel(message.severity), false, older);
+        });
+        if (older || logged === null) $("#syslog_older").toggle(data['more'] === true);
+    }
+
     if ('msg' in data) {
+        if (data['message']) {
+            if (isMessageLogged(data['message'].id, loggedMessages)) return;
+            setMessageLogged(data['message'].id);
+        }
+        var level = data['message'] ? getMessageLevel(data['message'].severity) : "success";
         data = data['msg'];
         if (data === undefined || data == null) return;
-        syslogPrint(data, "success");
+        syslogPrint(data, level);
     }
 }
 
+function isMessageLogged(id, logged) {
+    return logged !== null && id >= logged[0] && id <= logged[1];
+}
+
+function setMessageLogged(id) {
+    // pages of older history extend the range downwards, new messages upwards
+    if (loggedMessages === null)
+        loggedMessages = [id, id];
+    loggedMessages[0] = Math.min(loggedMessages[0], id);
+    loggedMessages[1] = Math.max(loggedMessages[1], id);
+}
+
+function getMessageLevel(severity) {
+    if (severity == "ERROR") return "danger";
+    if (severity == "WARNING") return "warning";
+    return "success";
+}
+
+function requestMessages(before, severity) {
+    // request page of INDI message history older than message id before
+    socket.emit('equipment_messages', {'before': before, 'severity': severity});
+}
+
+function requestPreview(enable) {
+    // subscribe to previews of all cameras
+    previewEnabled = enable;
+    var cameras = equipmentDevices.CCD ? equipmentDevices.CCD : [];
+    $.each(cameras, function (i, device) {
+        socket.emit('equipment_blob', {'device': device, 'enable': enable});
+    });
+    if (!enable) $("#equipment_preview").hide();
+}
+
+function updatePreview(data) {
+    if (data === undefined || data === null || data.image === undefined)
+        return;
+
+    var preview = document.getElementById("equipment_preview");
+    if (preview === null) return;
+
+    var image = new Blob([data.image], {type: 'image/' + (data.format == 'jpg' ? 'jpeg' : data.format)});
+    if (preview.src) URL.revokeObjectURL(preview.src);
+    preview.src = URL.createObjectURL(image);
+    preview.title = data.device;
+    $(preview).show();
+}
+
 /* ================================================== */
 /*              Control equipment image
 /* ================================================== */
@@ -739,6 +873,15 @@ function equipmentEvents() {
         $("#profile_name").val("");
         toggleProfileSettings();
     });
+
+    $("#toggle-preview").on("click", function () {
+        $("#toggle-preview").toggleClass("button-active");
+        requestPreview($("#toggle-preview").hasClass("button-active"));
+    });
+
+    $("#syslog_older").on("click", function () {
+        if (loggedMessages !== null) requestMessages(loggedMessages[0]);
+    });
 }
 
 function toggleProfile() {
@@ -779,6 +922,8 @@ export {
     indiServerDisconnected,
     indiwebEvents,
     updateEquipment,
+    mergeEquipment,
+    updatePreview,
     equipmentEvents
 };
 
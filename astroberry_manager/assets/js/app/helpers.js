@@ -24,7 +24,7 @@ import { focusTerminal } from './terminal.js';
 import { timeNow } from './time.js';
 import { mainMap, locationEvents } from './location.js';
 import { requestWeather, weatherEvents } from './weather.js';
-import { requestAlmanac, almanacEvents } from './almanac.js';
+import { almanacEvents } from './almanac.js';
 import { starchartEvents } from './celestial.js';
 import { updateINDI, indiwebEvents, equipmentEvents } from './equipment.js';
 import { requestDesktop, closeDesktop } from './desktop.js';
@@ -58,7 +58,6 @@ function mainLoop() {
     // Run every minute
     if (++minuteCounter > (60000 / mainLoopInterval)) {
         minuteCounter = 0;
-        requestAlmanac();
     }
 
     // Run every hour
@@ -249,7 +248,7 @@ function appEvents() {
 /*                        SYSTEM LOGGING ROUTINE
 /* ================================================================== */
 
-function syslogPrint(msg, level, popup = false) {
+function syslogPrint(msg, level, popup = false, older = false) {
     var alert_level = "alert-warning";
     var msg_level = "INFO";
     var color = "#eeeeee";
@@ -281,14 +280,18 @@ function syslogPrint(msg, level, popup = false) {
     // msg = eventTime + ": [" + msg_level + "] " + msg;
 
     stream = "<font color=" + color + ">" + msg + "</font><br>";
-    $("#syslog").append(stream);
+    if (older) // older history goes on top
+        $("#syslog").prepend(stream);
+    else
+        $("#syslog").append(stream);
 
     console.log(msg);
 
     if (popup)
         $("#notify_message").html('<div class="alert ' + alert_level + '">' + msg + '</div>').fadeIn().delay(3000).fadeOut("slow");
 
-    document.getElementById('syslog').scrollTop = document.getElementById('syslog').scrollHeight;
+    if (!older)
+        document.getElementById('syslog').scrollTop = document.getElementById('syslog').scrollHeight;
 }
 
 /* ================================================================== */
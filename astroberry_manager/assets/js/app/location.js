@@ -22,8 +22,9 @@
 
 import { getCookie, setCookie, syslogPrint } from './helpers.js';
 import { timeNow, updateTime } from './time.js';
-import { updateStarChartLocation } from './celestial.js';
+import { updateStarChartLocation, getTelescopeDevice } from './celestial.js';
 import { requestWeather } from './weather.js';
+import { requestAlmanac } from './almanac.js';
 import { deg2dms } from './functions.js';
 import { socket } from './sockets.js';
 
@@ -271,6 +272,9 @@ function updateGeoLocation(location = {}) {
             // Update weather
             requestWeather();
 
+            // Update almanac site, almanac is pushed by the server
+            requestAlmanac();
+
             syslogPrint("Location updated", "success");
         }
     }
@@ -617,7 +621,8 @@ function gpsSignalChart(satellites) {
 }
 
 function setTelescopeLocation() {
-    socket.timeout(5000).emit("equipment", geoLocation, (err) => {
+    var telescopeLocation = Object.assign({ device: getTelescopeDevice() }, geoLocation);
+    socket.timeout(5000).emit("equipment", telescopeLocation, (err) => {
         if (err) {
             console.log("Setting telescope location timed out");
         } else {
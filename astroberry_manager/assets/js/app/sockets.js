@@ -23,9 +23,9 @@
 import { updateTime } from './time.js';
 import { updateGeoLocation } from './location.js';
 import { updateWeather } from './weather.js';
-import { updateAlmanac } from './almanac.js';
-import { indiServerConnected, indiServerDisconnected, updateEquipment } from './equipment.js';
-import { updateTelescope } from './celestial.js';
+import { updateAlmanac, updatePolaris, requestAlmanac } from './almanac.js';
+import { indiServerConnected, indiServerDisconnected, updateEquipment, mergeEquipment, updatePreview } from './equipment.js';
+import { updateTelescope, updateTelescopeDevices } from './celestial.js';
 import { updateSystem } from './system.js';
 import { syslogPrint } from './helpers.js';
 
@@ -58,6 +58,7 @@ function setSockets() {
     socket.on('connect', function(){
         console.log('Socket connected');
         connected = true;
+        requestAlmanac(); // almanac is sent to clients of a site, join it again after reconnect
 	/*
 	const transport = socket.io.engine.transport.name; // in most cases, "polling"
 	console.log("Socket transport: " + transport);
@@ -132,12 +133,24 @@ function setSockets() {
         updateAlmanac(data);
     });
 
+    socket.on('polaris', function (data) { // polar alignment
+        //console.log("polaris: " + data);
+        updatePolaris(data);
+    });
+
     socket.on('equipment', function (data) { // equipment
         //console.log("equipment" + data);
-        if (data.connect) indiServerConnected();
-        if (data.disconnect) indiServerDisconnected();
-        updateEquipment(data);
-        updateTelescope(data);
+        if (data.batch) { // coalesced property updates
+            $.each(data.batch, function (i, update) {
+                processEquipment(update);
+            });
+        } else {
+            processEquipment(data);
+        }
+    });
+
+    socket.on('equipment_blob', function (data) { // camera preview
+        updatePreview(data);
     });
 
     socket.on('system', function (data) { // equipment
@@ -178,6 +191,16 @@ function setSockets() {
     });
 }
 
+function processEquipment(data) {
+    data = mergeEquipment(data);
+    if (data === null) return;
+    if (data.connect) indiServerConnected();
+    if (data.disconnect) indiServerDisconnected();
+    if (data.devices) updateTelescopeDevices(data.devices);
+    updateEquipment(data);
+    updateTelescope(data);
+}
+
 export {
     socket,
     setSockets
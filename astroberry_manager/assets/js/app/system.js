@@ -51,6 +51,18 @@ function updateSystem(data) {
     $("#sysmon-resource-diskavail").html(data.disk_info['/'].free_space.toFixed(2) + " GB");
     $("#sysmon-resource-diskused").html(data.disk_info['/'].used_space.toFixed(2) + " GB (" + data.disk_info['/'].usage_percentage + "%)");
 
+    var workers = data.manager_info.workers;
+    $("#sysmon-resource-workers").html(workers.size + " / " + workers.jobs + " jobs (" + workers.inline + " inline, " + workers.failed + " failed) / " + workers.run_avg + " ms avg, " + workers.run_max + " ms max");
+
+    var caches = data.manager_info.caches;
+    $("#sysmon-resource-caches").html(Object.keys(caches).map(name => name + " " + caches[name].hits + "/" + caches[name].misses).join(", "));
+
+    var equipment = data.manager_info.equipment;
+    $("#sysmon-resource-equipment").html(equipment.updates + " updates (" + equipment.coalesced + " coalesced) / " + equipment.messages + " sent / " + equipment.blobs + " BLOBs (" + equipment.blobs_dropped + " dropped)");
+
+    var bridge = data.manager_info.bridge;
+    $("#sysmon-resource-bridge").html(bridge.callbacks + " callbacks (" + bridge.superseded + " superseded, " + bridge.dropped + " dropped) / " + bridge.queued + " queued, " + bridge.max_queued + " max / " + bridge.latency_avg + " ms avg, " + bridge.latency_max + " ms max");
+
     // decorations
     if (data.cpu_info.total_cpu_usage > 80) { // CPU Usage
         $("#sysmon-resource-cpuusage").prev().css({ background: '#ff3300' });
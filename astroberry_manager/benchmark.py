@@ -0,0 +1,402 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Almanac and equipment benchmarks and golden output check
+
+python -m astroberry_manager.benchmark            report per call latency
+python -m astroberry_manager.benchmark --check    compare almanac with recorded golden outputs
+python -m astroberry_manager.benchmark --record   record golden outputs after intended output changes only
+python -m astroberry_manager.benchmark --equipment [--speed SPEED] [SESSION ...]
+                                                  replay INDI sessions through IndiClient and report throughput
+python -m astroberry_manager.benchmark --properties
+                                                  report time and memory allocated per property update
+"""
+
+import os, sys, time, json, numpy, subprocess, socket, tracemalloc
+from . import almanac
+
+GOLDEN = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'tests', 'almanac.json') # source tree only
+
+# equator, tropics, mid-latitudes, polar circles and polar regions of both hemispheres
+LATITUDES = [0.0, 23.4, -33.9, 45.5, 52.2, -66.6, 66.6, 70.0, -78.0, 89.0]
+LONGITUDE = 21.0
+ELEVATION = 100.0
+
+# equinoxes and solstices, daytime and nighttime
+TIMES = [
+    '2026-03-20T12:00:00.000Z', '2026-03-20T23:00:00.000Z',
+    '2026-06-21T12:00:00.000Z', '2026-06-21T23:00:00.000Z',
+    '2026-09-23T12:00:00.000Z', '2026-09-23T23:00:00.000Z',
+    '2026-12-21T12:00:00.000Z', '2026-12-21T23:00:00.000Z'
+]
+
+class StubSocketIO(object):
+    def __init__(self):
+        self.emitted = []
+
+    def emit(self, event, data, to=None):
+        self.emitted.append((event, data, to))
+
+class EquipmentSocketIO(StubSocketIO):
+    """Count emitted equipment messages and bytes, and time them from the INDI callbacks they carry"""
+    def __init__(self):
+        StubSocketIO.__init__(self)
+        self.callbacks = {} # key -> time of first callback not emitted yet
+        self.latencies = []
+        self.messages = 0
+        self.bytes = 0
+        self.last = None
+        self.disconnected = False
+
+    def received(self, kind, data):
+        if kind == 'new':
+            key = ('property', data.device, data.name)
+        elif kind == 'update':
+            key = ('property', data[0], data[1])
+        elif kind == 'msg':
+            key = ('msg', data[1], data[3])
+        elif kind == 'blob':
+            key = ('blob', data[0])
+        else:
+            return
+        self.callbacks.setdefault(key, time.perf_counter())
+
+    def emit(self, event, data, to=None):
+        now = time.perf_counter()
+        self.messages += 1
+        self.bytes += getPayloadSize(data)
+        self.last = now
+        if event == 'equipment_blob':
+            self.sent(('blob', data['device']), now)
+        else:
+            self.sentEquipment(data, now)
+
+    def sentEquipment(self, data, now):
+        for update in data.get('batch', []):
+            self.sentEquipment(update, now)
+        for devices in data.get('equipment', {}).values():
+            for device, properties in devices.items():
+                for name in properties:
+                    self.sent(('property', device, name), now)
+        if 'delta' in data:
+            self.sent(('property', data['delta']['DEVICE'], data['delta']['PROPERTY']), now)
+        if 'message' in data:
+            self.sent(('msg', data['message']['device'], data['message']['text']), now)
+        if 'disconnect' in data:
+            self.disconnected = True
+
+    def sent(self, key, now):
+        start = self.callbacks.pop(key, None)
+        if start is not None:
+            self.latencies.append((now - start) * 1000)
+
+def getPayloadSize(data):
+    """Return size of JSON encoded payload plus its binary attachments"""
+    binary = []
+    text = json.dumps(data, default=lambda value: binary.append(len(value)))
+    return len(text) + sum(binary)
+
+def waitForPort(port, timeout=10):
+    start = time.time()
+    while time.time() - start < timeout:
+        try:
+            socket.create_connection(('127.0.0.1', port), 0.1).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def runEquipmentBenchmark(sessions, speed=0, timeout=300):
+    """
+    Replay sessions from a local INDI stand-in through IndiClient, bridge and emitEquipment
+    The bridge and coalescer are greenlets as in the server, so the process is monkey patched
+    before equipment is imported.
+    """
+    import gevent
+    from gevent import monkey
+    monkey.patch_all()
+    from . import equipment, indisim
+
+    port = indisim.INDI_PORT
+    server = subprocess.Popen([sys.executable, indisim.__file__, '--port', str(port), '--speed', str(speed)] + sessions)
+    if not waitForPort(port):
+        server.kill()
+        print("INDI stand-in did not start on port %d" % port)
+        return
+
+    socketio = EquipmentSocketIO()
+    pushEquipment = equipment.pushEquipment
+
+    def pushTimed(kind, data, key=None):
+        socketio.received(kind, data)
+        pushEquipment(kind, data, key)
+
+    equipment.pushEquipment = pushTimed
+    equipment.subscribeEquipment('benchmark', [{}]) # all equipment, as a client by default
+    equipment.setBlobs(indisim.CCD_DEVICE, True, 'benchmark') # make previews of frames
+    equipment.indiClient.setServer('127.0.0.1', port)
+    equipment.indiClient.socketio = socketio
+    gevent.spawn(equipment.getEquipmentBridge, socketio)
+    if equipment.COALESCE_WINDOW > 0:
+        gevent.spawn(equipment.getEquipmentUpdates, socketio)
+
+    callbacks = equipment.getBridgeStats()['callbacks']
+    start = time.perf_counter()
+    try:
+        equipment.connectServer()
+        while not socketio.disconnected and time.perf_counter() - start < timeout:
+            gevent.sleep(0.1)
+    finally:
+        equipment.pushEquipment = pushEquipment
+        equipment.indiClient.disconnectServer()
+        server.terminate()
+        server.wait()
+
+    stats = equipment.getBridgeStats()
+    callbacks = stats['callbacks'] - callbacks
+    elapsed = (socketio.last or time.perf_counter()) - start
+    latencies = socketio.latencies or [0]
+
+    print("%-32s %10s" % ("sessions", ', '.join(sessions or indisim.SESSIONS)))
+    print("%-32s %10s" % ("speed", speed or "max"))
+    print("%-32s %10.2f" % ("elapsed [s]", elapsed))
+    print("%-32s %10d %10.0f" % ("callbacks, per second", callbacks, callbacks / elapsed))
+    print("%-32s %10d %10.0f" % ("emitted messages, per second", socketio.messages, socketio.messages / elapsed))
+    print("%-32s %10d %10.0f" % ("emitted bytes, per second", socketio.bytes, socketio.bytes / elapsed))
+    print("%-32s %10d %10s" % ("callbacks superseded, dropped", stats['superseded'], stats['dropped']))
+    print("%-32s %10d" % ("updates coalesced", equipment.getEquipmentStats()['coalesced']))
+    print("%-32s %10.3f %10.3f %10.3f" % ("callback to emit p50, p99, max [ms]", numpy.percentile(latencies, 50), numpy.percentile(latencies, 99), numpy.max(latencies)))
+
+class StubElement(object):
+    def __init__(self, name, label, value):
+        self.name = name
+        self.label = label
+        self.value = value
+
+class StubDevice(object):
+    def __init__(self, name, interface):
+        self.name = name
+        self.interface = interface
+
+    def getDeviceName(self):
+        return self.name
+
+    def getDriverInterface(self):
+        return self.interface
+
+class StubProperty(object):
+    """Number property with the accessors of PyIndi properties IndiClient callbacks use"""
+    def __init__(self, device, name, group, elements):
+        self.device = device
+        self.name = name
+        self.group = group
+        self.elements = elements
+
+    def getBaseDevice(self):
+        return self.device
+
+    def getDeviceName(self):
+        return self.device.name
+
+    def getName(self):
+        return self.name
+
+    def getGroupName(self):
+        return self.group
+
+    def getLabel(self):
+        return self.name
+
+    def getType(self):
+        from .equipment import PyIndi
+        return PyIndi.INDI_NUMBER
+
+    def getTypeAsString(self):
+        return 'INDI_NUMBER'
+
+    def getStateAsString(self):
+        return 'Busy'
+
+    def getPermission(self):
+        return 2
+
+    def getNumber(self):
+        return self.elements
+
+def runPropertyBenchmark(repeat=10000):
+    """Time updateProperty callbacks of a slewing mount through the bridge up to a serialized message"""
+    from . import equipment
+
+    socketio = EquipmentSocketIO()
+    equipment.subscribeEquipment('benchmark', [{}])
+    equipment.indiClient.socketio = socketio # no bridge running, queued callbacks are drained here
+
+    device = StubDevice('Telescope Simulator', 1)
+    elements = [StubElement('RA', 'RA (hh:mm:ss)', 0.0), StubElement('DEC', 'DEC (dd:mm:ss)', 90.0)]
+    property = StubProperty(device, 'EQUATORIAL_EOD_COORD', 'Main Control', elements)
+    equipment.indiClient.newDevice(device)
+    equipment.indiClient.newProperty(property)
+    equipment.drainEquipment(socketio)
+    equipment.flushEquipment(socketio)
+
+    def update(i):
+        elements[0].value = i * 1e-4
+        elements[1].value = 90 - i * 1e-4
+        equipment.indiClient.updateProperty(property)
+        equipment.drainEquipment(socketio)
+
+    def flush(i):
+        equipment.flushEquipment(socketio)
+
+    def measureUpdate(name, call, traced):
+        elapsed = 0
+        allocated = []
+        for i in range(repeat):
+            if call is flush:
+                update(i)
+            current = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            start = time.perf_counter()
+            call(i)
+            elapsed += time.perf_counter() - start
+            allocated.append(tracemalloc.get_traced_memory()[1] - current)
+            if call is update:
+                flush(i)
+        return elapsed / repeat * 1e6, numpy.mean(allocated) if traced else None
+
+    print("%-32s %10s %10s" % ("number, 2 elements", "time [us]", "peak [B]"))
+    for name, call in (("updateProperty", update), ("flushEquipment", flush)):
+        measureUpdate(name, call, False) # warm up
+        elapsed = measureUpdate(name, call, False)[0]
+        tracemalloc.start()
+        allocated = measureUpdate(name, call, True)[1]
+        tracemalloc.stop()
+        print("%-32s %10.2f %10.0f" % (name, elapsed, allocated))
+
+def getArguments():
+    """Return arguments that are not options or their values"""
+    arguments = []
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg == '--speed':
+            next(args)
+        elif not arg.startswith('--'):
+            arguments.append(arg)
+    return arguments
+
+def setTimezone():
+    # golden outputs are formatted in local time
+    os.environ['TZ'] = 'UTC'
+    time.tzset()
+
+def resetAlmanac():
+    almanac.eventsCache = almanac.AlmanacCache(bucket=None)
+    almanac.positionsCache = almanac.AlmanacCache()
+    almanac.almanacSite = None
+    almanac.almanacSites = {}
+    almanac.siteClients = {}
+    almanac.lunations = []
+
+def getGolden():
+    golden = {}
+    for gpstime in TIMES:
+        for latitude in LATITUDES:
+            home = almanac.getObserver(gpstime, latitude, LONGITUDE, ELEVATION)
+            data = almanac.computeAlmanac(home)
+            data.pop('almanac_events')
+            golden["%s %s" % (gpstime, latitude)] = data
+    return golden
+
+def recordGolden(path=GOLDEN):
+    with open(path, 'w') as f:
+        json.dump(getGolden(), f, indent=1, sort_keys=True, ensure_ascii=False)
+    print("Golden outputs recorded to %s" % path)
+
+def checkGolden(path=GOLDEN):
+    with open(path) as f:
+        golden = json.load(f)
+
+    failures = 0
+    for key, data in getGolden().items():
+        expected = golden.get(key)
+        if expected is None:
+            print("%s: no golden output" % key)
+            failures += 1
+            continue
+        for name in sorted(set(expected) | set(data)):
+            if expected.get(name) != data.get(name):
+                print("%s: %s expected %s got %s" % (key, name, expected.get(name), data.get(name)))
+                failures += 1
+
+    print("%d differences in %d almanacs" % (failures, len(golden)))
+    return failures
+
+def measure(name, call, repeat):
+    timings = []
+    for i in range(repeat):
+        start = time.perf_counter()
+        call()
+        timings.append((time.perf_counter() - start) * 1000)
+    print("%-32s %10.3f %10.3f %10.3f" % (name, numpy.mean(timings), numpy.percentile(timings, 50), numpy.max(timings)))
+
+def runBenchmark(repeat=20):
+    socketio = StubSocketIO()
+    gpstime = TIMES[0]
+    home = almanac.getObserver(gpstime, LATITUDES[4], LONGITUDE, ELEVATION)
+
+    def getAlmanacCold():
+        resetAlmanac()
+        almanac.setAlmanacSite('benchmark', LATITUDES[4], LONGITUDE, ELEVATION)
+        almanac.getAlmanac(socketio, gpstime, LATITUDES[4], LONGITUDE, ELEVATION)
+
+    def getAlmanacWarm():
+        almanac.getAlmanacReportOnce(socketio, almanac.getAlmanacSite(), gpstime)
+
+    print("%-32s %10s %10s %10s" % ("call [ms]", "mean", "p50", "max"))
+    measure("getAlmanac (cold)", getAlmanacCold, repeat)
+    measure("getAlmanac (cached)", getAlmanacWarm, repeat)
+    measure("computeAlmanacEvents", lambda: almanac.computeAlmanacEvents(home), repeat)
+    measure("computeAlmanacPositions", lambda: almanac.computeAlmanacPositions(home), repeat)
+    measure("getBodyPositions (Moon)", lambda: almanac.getBodyPositions(home, almanac.ephem.Moon(home)), repeat)
+    measure("getSunTwilights", lambda: almanac.getSunTwilights(home), repeat)
+    measure("getMoonPhase", lambda: almanac.getMoonPhase(home), repeat)
+
+def main():
+    setTimezone()
+    if '--record' in sys.argv:
+        recordGolden()
+    elif '--check' in sys.argv:
+        sys.exit(1 if checkGolden() else 0)
+    elif '--properties' in sys.argv:
+        runPropertyBenchmark()
+    elif '--equipment' in sys.argv:
+        speed = float(sys.argv[sys.argv.index('--speed') + 1]) if '--speed' in sys.argv else 0
+        runEquipmentBenchmark(getArguments(), speed)
+    else:
+        runBenchmark()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Coordinate transforms and horizon checks of many targets at once
+
+Catalog (J2000) RA/Dec in degrees are precessed to the equinox of date with one rotation
+matrix, turned to Alt/Az with the apparent sidereal time and corrected for refraction at
+ephem's default conditions. Nutation and aberration are left out, which keeps positions above
+the horizon within 45 arcseconds of ephem (up to 40 measured from 2000 to 2045). Runs in worker
+processes, so it must not depend on PyIndi.
+"""
+
+import os, json, datetime, ephem, numpy
+
+HORIZON = os.path.join(os.getenv('HOME', '/'), '.astroberry', 'horizon.json') # [[azimuth, minimum altitude], ...]
+PRESSURE = 1010 # mBar, ephem default
+TEMPERATURE = 15 # C, ephem default
+MOSAIC_SIZE = 100 # maximum number of mosaic panels
+
+horizon = None # [mtime, azimuths, altitudes]
+
+def getVector(ra, dec):
+    return numpy.array([numpy.cos(dec) * numpy.cos(ra), numpy.cos(dec) * numpy.sin(ra), numpy.sin(dec)])
+
+def getPrecession(date):
+    """Return rotation matrix from J2000 to equinox of date, from precessed unit vectors"""
+    columns = []
+    for ra, dec in ((0, 0), (numpy.pi / 2, 0), (0, numpy.pi / 2)):
+        equatorial = ephem.Equatorial(ephem.Equatorial(ra, dec, epoch=ephem.J2000), epoch=date)
+        columns.append(getVector(float(equatorial.ra), float(equatorial.dec)))
+    return numpy.array(columns).T
+
+def getSiderealTime(date, longitude):
+    """Return local apparent sidereal time in radians"""
+    observer = ephem.Observer()
+    observer.lon = numpy.radians(longitude)
+    observer.date = date
+    return float(observer.sidereal_time())
+
+def getRefraction(alt):
+    """Return refraction in degrees of true altitudes in degrees (Saemundsson), none well below the horizon"""
+    alt = numpy.asarray(alt, dtype=float)
+    clipped = numpy.maximum(alt, -1.0) # no refraction formula below the horizon
+    refraction = 1.02 / numpy.tan(numpy.radians(clipped + 10.3 / (clipped + 5.11))) / 60
+    refraction *= PRESSURE / 1010.0 * 283.0 / (273.0 + TEMPERATURE)
+    return numpy.where(alt > -1.0, numpy.maximum(refraction, 0), 0)
+
+def getAzAlt(ra, dec, latitude, longitude, elevation=0, date=None):
+    """
+    Return (azimuth, altitude) arrays in degrees of J2000 RA/Dec in degrees
+    Azimuth counts from north through east, altitude includes refraction. Elevation does
+    not change positions of fixed bodies and is accepted for the sake of callers.
+    """
+    date = ephem.Date(date if date is not None else datetime.datetime.now(datetime.timezone.utc))
+
+    ra = numpy.radians(numpy.asarray(ra, dtype=float))
+    dec = numpy.radians(numpy.asarray(dec, dtype=float))
+    x, y, z = numpy.tensordot(getPrecession(date), getVector(ra, dec), axes=1)
+
+    ha = getSiderealTime(date, longitude) - numpy.arctan2(y, x)
+    dec = numpy.arcsin(numpy.clip(z, -1, 1))
+    lat = numpy.radians(latitude)
+
+    alt = numpy.degrees(numpy.arcsin(numpy.clip(numpy.sin(lat) * numpy.sin(dec) + numpy.cos(lat) * numpy.cos(dec) * numpy.cos(ha), -1, 1)))
+    az = numpy.degrees(numpy.arctan2(-numpy.cos(dec) * numpy.sin(ha), numpy.sin(dec) * numpy.cos(lat) - numpy.cos(dec) * numpy.sin(lat) * numpy.cos(ha))) % 360
+
+    return az, alt + getRefraction(alt)
+
+def loadHorizon(path=HORIZON):
+    """Return (azimuths, minimum altitudes) of horizon profile, loaded again when the file changes, flat if none"""
+    global horizon
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        horizon = None
+        return numpy.zeros(1), numpy.zeros(1)
+
+    if horizon is None or horizon[0] != mtime:
+        try:
+            with open(path) as f:
+                points = numpy.array(json.load(f), dtype=float).reshape(-1, 2)
+            points = points[numpy.argsort(points[:, 0] % 360)]
+            horizon = [mtime, points[:, 0] % 360, points[:, 1]]
+        except (OSError, ValueError):
+            horizon = None
+            return numpy.zeros(1), numpy.zeros(1)
+
+    return horizon[1], horizon[2]
+
+def saveHorizon(points, path=HORIZON):
+    """Save horizon profile given as [[azimuth, minimum altitude], ...] in degrees"""
+    points = [[float(az) % 360, float(alt)] for az, alt in points]
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        json.dump(sorted(points), f)
+
+def getHorizon():
+    azimuths, altitudes = loadHorizon()
+    if horizon is None:
+        return {'horizon': []}
+    return {'horizon': [["%.2f" % az, "%.2f" % alt] for az, alt in zip(azimuths, altitudes)]}
+
+def getHorizonAltitude(az):
+    """Return minimum altitude at azimuths, interpolated around the circle"""
+    azimuths, altitudes = loadHorizon()
+    return numpy.interp(az, azimuths, altitudes, period=360)
+
+def checkHorizon(ra, dec, latitude, longitude, elevation=0, date=None):
+    """Return azimuths, altitudes, horizon altitudes and visibility of J2000 RA/Dec in degrees"""
+    az, alt = getAzAlt(ra, dec, latitude, longitude, elevation, date)
+    minimum = getHorizonAltitude(az)
+    return {'az': az, 'alt': alt, 'horizon': minimum, 'visible': alt >= minimum}
+
+def getMosaic(ra, dec, columns, rows, width, height, overlap=0):
+    """
+    Return RA/Dec arrays of centers of mosaic panels around RA/Dec in degrees
+    width and height of a panel are in degrees, overlap is a fraction of a panel.
+    """
+    x = (numpy.arange(columns) - (columns - 1) / 2.0) * width * (1 - overlap)
+    y = (numpy.arange(rows) - (rows - 1) / 2.0) * height * (1 - overlap)
+    x, y = numpy.meshgrid(x, y)
+    dec = numpy.clip(dec + y.ravel(), -90, 90)
+    ra = (ra + x.ravel() / numpy.maximum(numpy.cos(numpy.radians(dec)), 1e-6)) % 360
+    return ra, dec
+
+def getTargets(socketio, data, to=None):
+    targets = getTargetsOnce(data)
+    if targets:
+        socketio.emit('targets', targets, to=to)
+
+def getTargetsOnce(data):
+    """
+    Return horizon check of a target list or mosaic panels
+    data holds latitude, longitude, altitude and time (now if not given) and either targets
+    [{name, ra, dec}, ...] or mosaic {ra, dec, columns, rows, width, height, overlap}.
+    """
+    try:
+        latitude, longitude, elevation = float(data['latitude']), float(data['longitude']), float(data.get('altitude') or 0)
+        if 'mosaic' in data:
+            mosaic = data['mosaic']
+            columns, rows = int(mosaic['columns']), int(mosaic['rows'])
+            if columns < 1 or rows < 1 or columns * rows > MOSAIC_SIZE:
+                return
+            ra, dec = getMosaic(float(mosaic['ra']), float(mosaic['dec']), columns, rows, float(mosaic['width']), float(mosaic['height']), float(mosaic.get('overlap', 0)))
+            names = ["Panel %d" % (i + 1) for i in range(len(ra))]
+        else:
+            ra = [float(target['ra']) for target in data['targets']]
+            dec = [float(target['dec']) for target in data['targets']]
+            names = [target.get('name', '') for target in data['targets']]
+        date = ephem.Date(datetime.datetime.strptime(data['time'], '%Y-%m-%dT%H:%M:%S.%f%z')) if data.get('time') else None
+    except (KeyError, TypeError, ValueError):
+        return
+
+    check = checkHorizon(ra, dec, latitude, longitude, elevation, date)
+
+    targets = []
+    for i, name in enumerate(names):
+        targets.append({
+            'name': name,
+            'ra': "%.2f" % ra[i],
+            'dec': "%.2f" % dec[i],
+            'az': "%.2f" % check['az'][i],
+            'alt': "%.2f" % check['alt'][i],
+            'horizon': "%.2f" % check['horizon'][i],
+            'visible': bool(check['visible'][i])
+        })
+
+    return {'visible': int(numpy.count_nonzero(check['visible'])), 'total': len(targets), 'targets': targets}
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Yearly ephemeris calendar of a fixed site
+
+astroberry-ephemeris LATITUDE LONGITUDE [ELEVATION] [YEAR]
+
+Rise, transit and set of the Sun and the Moon, twilights and lunations of every local day
+are precomputed into a structured numpy array, which the almanac memory-maps and looks
+events up in when the active site matches.
+"""
+
+import os, sys, json, datetime, ephem, numpy
+
+CALENDAR = os.path.join(os.getenv('HOME', '/'), '.astroberry', 'ephemeris.npy')
+
+# body, horizon and column prefix of each rise/set series, twilights use upper limb as in almanac
+SERIES = [
+    ('Sun', '0', 'sun'),
+    ('Sun', '-6', 'civil'),
+    ('Sun', '-12', 'nautical'),
+    ('Sun', '-18', 'astronomical'),
+    ('Moon', '0', 'moon')
+]
+
+STABLE = 2 * ephem.second # events found searching forward and backward must agree
+
+LUNATIONS = ['', 'New', 'First Quarter', 'Full', 'Last Quarter']
+
+# ephem dates of events within each local day, NaN if none
+DTYPE = numpy.dtype([
+    ('day', 'f8'),
+    ('sun_rise', 'f8'), ('sun_transit', 'f8'), ('sun_set', 'f8'),
+    ('civil_rise', 'f8'), ('civil_set', 'f8'),
+    ('nautical_rise', 'f8'), ('nautical_set', 'f8'),
+    ('astronomical_rise', 'f8'), ('astronomical_set', 'f8'),
+    ('moon_rise', 'f8'), ('moon_transit', 'f8'), ('moon_set', 'f8'),
+    ('lunation', 'f8'), ('lunation_phase', 'u1')
+])
+
+calendar = None # [mtime, site, rows]
+
+def getSite(latitude, longitude, elevation):
+    # same rounding as almanac cache
+    return [round(latitude, 2), round(longitude, 2), round(elevation)]
+
+def getMidnight(day):
+    midnight = datetime.datetime.combine(day, datetime.time())
+    return ephem.Date(datetime.datetime.fromtimestamp(midnight.timestamp(), datetime.timezone.utc))
+
+def buildCalendar(latitude, longitude, elevation, year):
+    observer = ephem.Observer()
+    observer.lat = "%s" % latitude
+    observer.lon = "%s" % longitude
+    observer.elevation = float(elevation)
+
+    bodies = {'Sun': ephem.Sun(), 'Moon': ephem.Moon()}
+
+    # one extra day on both ends for previous and next events
+    first = datetime.date(year, 1, 1) - datetime.timedelta(days=1)
+    days = (datetime.date(year + 1, 1, 1) - first).days + 1
+
+    rows = numpy.zeros(days, dtype=DTYPE)
+    for field in DTYPE.names[1:-1]:
+        rows[field] = numpy.nan
+
+    for i in range(days):
+        start = getMidnight(first + datetime.timedelta(days=i))
+        end = getMidnight(first + datetime.timedelta(days=i + 1))
+        rows['day'][i] = start
+
+        for name, horizon, column in SERIES:
+            observer.horizon = horizon
+            searches = [('next_rising', column + '_rise'), ('next_setting', column + '_set')]
+            if horizon == '0':
+                searches.append(('next_transit', column + '_transit'))
+            for search, field in searches:
+                try:
+                    event = getattr(observer, search)(bodies[name], start=start)
+                    # grazing events depend on where the search starts, leave them for live search
+                    if event < end and abs(getattr(observer, search.replace('next', 'previous'))(bodies[name], start=end) - event) < STABLE:
+                        rows[field][i] = event
+                except (ephem.NeverUpError, ephem.AlwaysUpError):
+                    continue
+
+    # lunations
+    searches = [ephem.next_new_moon, ephem.next_first_quarter_moon, ephem.next_full_moon, ephem.next_last_quarter_moon]
+    event = ephem.previous_new_moon(rows['day'][0])
+    phase = 0
+    while True:
+        event = searches[(phase + 1) % 4](event)
+        phase = (phase + 1) % 4
+        i = numpy.searchsorted(rows['day'], event, side='right') - 1
+        if i >= days - 1:
+            break
+        if i >= 0:
+            rows['lunation'][i] = event
+            rows['lunation_phase'][i] = phase + 1
+
+    return rows
+
+def saveCalendar(rows, latitude, longitude, elevation, path=CALENDAR):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(os.path.splitext(path)[0] + '.json', 'w') as f:
+        json.dump({'site': getSite(latitude, longitude, elevation)}, f)
+    numpy.save(path, rows)
+
+def loadCalendar(path=CALENDAR):
+    """Return memory-mapped calendar, loaded again when the file changes"""
+    global calendar
+
+    try:
+        mtime = os.path.getmtime(path)
+    except OSError:
+        calendar = None
+        return
+
+    if calendar is None or calendar[0] != mtime:
+        try:
+            with open(os.path.splitext(path)[0] + '.json') as f:
+                site = json.load(f)['site']
+            calendar = [mtime, site, numpy.load(path, mmap_mode='r')]
+        except (OSError, ValueError, KeyError):
+            calendar = None
+            return
+
+    return calendar
+
+def getCalendarRows(observer):
+    cal = loadCalendar()
+    if cal is None:
+        return
+
+    site = getSite(numpy.degrees(observer.lat), numpy.degrees(observer.lon), observer.elevation)
+    if site != cal[1]:
+        return
+
+    rows = cal[2]
+    i = numpy.searchsorted(rows['day'], observer.date, side='right') - 1
+    if i < 1 or i >= len(rows) - 1:
+        return
+
+    return rows[i - 1:i + 2]
+
+def fillSearches(observer, searches):
+    """
+    Fill rise/transit/set searches of the almanac from the calendar
+    Only events of the adjacent days are used, a series with a day without its event
+    (none that day or left for live search) is left for live search entirely.
+    Returns number of searches filled.
+    """
+    rows = getCalendarRows(observer)
+    if rows is None:
+        return 0
+
+    date = float(observer.date)
+    filled = 0
+    horizon = observer.horizon
+
+    for name, twi, column in SERIES:
+        observer.horizon = twi
+        key = str(observer.horizon)
+        transit = 'sun_transit' if name == 'Sun' else 'moon_transit'
+        for event, field in (('rising', column + '_rise'), ('transit', transit), ('setting', column + '_set')):
+            values = rows[field]
+            if numpy.isnan(values).any():
+                continue
+            previous = values[values <= date]
+            upcoming = values[values > date]
+            if len(previous):
+                searches[(name, key, 'previous_' + event)] = ephem.Date(previous[-1])
+                filled += 1
+            if len(upcoming):
+                searches[(name, key, 'next_' + event)] = ephem.Date(upcoming[0])
+                filled += 1
+
+    observer.horizon = horizon
+    return filled
+
+def getCalendar(month=None):
+    """Return calendar of a month (YYYY-MM), current month if not given"""
+    cal = loadCalendar()
+    if cal is None:
+        return
+
+    if month is None:
+        month = datetime.date.today().strftime('%Y-%m')
+
+    days = []
+    for row in cal[2]:
+        day = ephem.localtime(ephem.Date(row['day'])).date()
+        if day.strftime('%Y-%m') != month:
+            continue
+        data = {'date': day.strftime('%Y-%m-%d')}
+        for field in DTYPE.names[1:-2]:
+            data[field] = ephem.localtime(ephem.Date(row[field])).strftime("%H:%M:%S") if not numpy.isnan(row[field]) else '-'
+        if row['lunation_phase']:
+            data['lunation'] = LUNATIONS[row['lunation_phase']]
+            data['lunation_time'] = ephem.localtime(ephem.Date(row['lunation'])).strftime("%H:%M:%S")
+        days.append(data)
+
+    return {
+        'latitude': "%.2f" % cal[1][0],
+        'longitude': "%.2f" % cal[1][1],
+        'elevation': "%.2f" % cal[1][2],
+        'month': month,
+        'days': days
+    }
+
+def main():
+    if len(sys.argv) < 3:
+        print("Usage: astroberry-ephemeris LATITUDE LONGITUDE [ELEVATION] [YEAR]")
+        sys.exit(1)
+
+    latitude = float(sys.argv[1])
+    longitude = float(sys.argv[2])
+    elevation = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    year = int(sys.argv[4]) if len(sys.argv) > 4 else datetime.date.today().year
+
+    print("Computing ephemeris of %d for lat: %s long: %s elev: %s" % (year, latitude, longitude, elevation))
+    rows = buildCalendar(latitude, longitude, elevation, year)
+    saveCalendar(rows, latitude, longitude, elevation)
+    print("Ephemeris saved to %s" % CALENDAR)
+
+if __name__ == "__main__":
+    main()
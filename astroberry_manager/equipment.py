@@ -23,49 +23,135 @@ the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
 Boston, MA 02110-1301, USA.
 """
 
-import os, sys
-import ephem, time, json, logging, PyIndi
+import os, sys, re, tempfile
+import time, json, logging, PyIndi
 from datetime import datetime, timezone
+from threading import Lock, Event
+from random import uniform
+from collections import OrderedDict, deque
+from itertools import count
+try:
+	from gevent.monkey import get_original
+	allocateLock = get_original('_thread', 'allocate_lock')
+except ImportError:
+	from _thread import allocate_lock as allocateLock
+from .workers import submitJob
+from .coordinates import checkHorizon
+from .preview import getPreviewFile
 
 # Local INDI server
 INDI_HOST = '127.0.0.1'
 INDI_PORT = 7624
 TIMEOUT = 5
 
-# Suppress stdout and stderr coming from PyIndi underlying c++ and c libraries
-class suppress_stdout_stderr(object):
-	def __enter__(self):
-		self.outnull_file = open(os.devnull, 'w')
-		self.errnull_file = open(os.devnull, 'w')
-
-		self.old_stdout_fileno_undup    = sys.stdout.fileno()
-		self.old_stderr_fileno_undup    = sys.stderr.fileno()
-
-		self.old_stdout_fileno = os.dup ( sys.stdout.fileno() )
-		self.old_stderr_fileno = os.dup ( sys.stderr.fileno() )
-
-		self.old_stdout = sys.stdout
-		self.old_stderr = sys.stderr
-
-		os.dup2 ( self.outnull_file.fileno(), self.old_stdout_fileno_undup )
-		os.dup2 ( self.errnull_file.fileno(), self.old_stderr_fileno_undup )
-
-		sys.stdout = self.outnull_file
-		sys.stderr = self.errnull_file
-		return self
-
-	def __exit__(self, *_):
-		sys.stdout = self.old_stdout
-		sys.stderr = self.old_stderr
-
-		os.dup2 ( self.old_stdout_fileno, self.old_stdout_fileno_undup )
-		os.dup2 ( self.old_stderr_fileno, self.old_stderr_fileno_undup )
-
-		os.close ( self.old_stdout_fileno )
-		os.close ( self.old_stderr_fileno )
+# Reconnection to INDI server, waits double from RECONNECT_MIN up to RECONNECT_MAX
+# seconds, randomly spread by RECONNECT_JITTER so that clients do not retry in step
+RECONNECT_MIN = 1
+RECONNECT_MAX = 60
+RECONNECT_JITTER = 0.2
+
+# Native output of PyIndi c++ and c libraries, truncated on start
+NATIVE_LOG = os.path.join(os.getenv('HOME', '/'), '.astroberry', 'indiclient.log')
+stdioRedirected = False
+connectionChanged = Event() # set by the bridge when INDI server gets disconnected
+connectionStats = {'state': 'disconnected', 'attempts': 0, 'retries': 0, 'connects': 0, 'disconnects': 0, 'next_retry': None}
+
+# PyIndi calls IndiClient from its own thread. Callbacks only copy what they got into
+# plain objects and queue them, the queue is drained by a greenlet woken by an async
+# watcher. Pending item of a property is replaced by a newer one, pending messages are
+# limited to BRIDGE_MESSAGES with the oldest dropped. Queue check-and-set and pop are
+# guarded by a native lock, never a gevent one, since the PyIndi thread takes it too.
+BRIDGE_MESSAGES = 100
+bridgeLock = allocateLock()
+bridgeItems = {} # key -> [kind, data, time queued]
+bridgeOrder = deque() # keys in order of arrival
+bridgeMessages = deque() # keys of queued messages
+bridgeWatcher = None
+bridgeStats = {'callbacks': 0, 'superseded': 0, 'dropped': 0, 'max_queued': 0, 'processed': 0, 'latency': 0.0, 'latency_max': 0.0}
+bridgeSequence = count() # keys of events that are never replaced
+bridgeGeneration = 0 # bumped by connection and device changes, keeps property updates after them
+
+# INDI messages kept for clients connecting later, newest MESSAGES_SIZE of them
+MESSAGES_SIZE = 1000
+MESSAGES_PAGE = 50
+SEVERITIES = ['DEBUG', 'INFO', 'WARNING', 'ERROR']
+MESSAGE_FORMAT = re.compile(r'^(?P<timestamp>\d{4}-\d{2}-\d{2}T\d{2}:\d{2}:\d{2}(?:\.\d+)?):\s*(?:\[(?P<severity>[A-Z]+)\]\s*)?(?P<text>.*)$', re.S)
+messages = deque(maxlen=MESSAGES_SIZE)
+messageSequence = count(int(time.time() * 1000)) # ids keep growing across restarts, clients skip ids they logged
+
+# Clients subscribe to properties by filters of (device type, device, group), None matches any.
+# Each filter is a room, updates are sent only to rooms of filters matching them.
+subscriptions = {} # sid -> set of filters
+subscribedFilters = {} # filter -> number of subscribers
+subscriptionLock = Lock()
+
+# BLOB previews are sent only to clients that asked for them, at most BLOB_RATE per second
+# of a device and for BLOBs up to BLOB_SIZE bytes. Frames arriving while a preview of the
+# device is in progress are dropped. Frames are passed to workers in files in BLOB_PATH.
+BLOB_RATE = 1
+BLOB_SIZE = 32 * 1024 * 1024
+BLOB_PATH = '/dev/shm' if os.path.isdir('/dev/shm') else None # memory backed if available
+blobSubscribers = {} # device -> client sids
+blobFrames = {} # device -> [time of last preview, preview in progress]
+blobLock = Lock()
+
+# Device types of INDI driver interface bits, bit n is DEVICE_TYPES[n]
+# Based on https://github.com/indilib/indi/blob/master/libs/indidevice/basedevice.h#L83
+DEVICE_TYPES = ["TELESCOPE", "CCD", "GUIDER", "FOCUSER", "FILTER", "DOME", "GPS", "WEATHER", "AO", "DUSTCAP", "LIGHTBOX", "DETECTOR", "ROTATOR", "SPECTROGRAPH", "CORRELATOR", "AUX"]
+
+# Devices of every type and interfaces of every device, a device is listed under all its types
+deviceRegistry = {device_type: OrderedDict() for device_type in DEVICE_TYPES}
+deviceInterfaces = {}
+registryLock = Lock()
+
+# Live state of equipment, device -> property -> last sent property with its version
+equipmentState = {}
+stateLock = Lock()
+
+# Property updates are collected for COALESCE_WINDOW seconds and sent in one message,
+# last value wins per property. 0 sends every update at once.
+COALESCE_WINDOW = 0.1
+pendingUpdates = OrderedDict() # (device, property) -> data
+pendingLock = Lock()
+equipmentStats = {'updates': 0, 'coalesced': 0, 'messages': 0, 'blobs': 0, 'blobs_dropped': 0}
+
+# Keep stdout and stderr coming from PyIndi underlying c++ and c libraries off the console
+def redirectNativeStdio():
+	"""
+	Send native stdout and stderr to NATIVE_LOG for the process lifetime
+	Descriptors are shared by the whole process, so this also catches native output of other
+	libraries and of child processes started later, nothing is discarded. Python streams and
+	logging handlers are moved to copies of the original descriptors.
+	"""
+	global stdioRedirected
 
-		self.outnull_file.close()
-		self.errnull_file.close()
+	if stdioRedirected:
+		return
+	stdioRedirected = True
+
+	streams = {}
+	for fd, name in ((1, 'stdout'), (2, 'stderr')):
+		old = getattr(sys, name)
+		old.flush()
+		new = os.fdopen(os.dup(fd), 'w', buffering=1)
+		setattr(sys, name, new)
+		streams[id(old)] = new
+
+	try:
+		os.makedirs(os.path.dirname(NATIVE_LOG), exist_ok=True)
+		log = os.open(NATIVE_LOG, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | os.O_APPEND, 0o644)
+	except OSError as e:
+		print(f"Error opening {NATIVE_LOG}: {e}")
+		log = os.open(os.devnull, os.O_WRONLY)
+	os.dup2(log, 1)
+	os.dup2(log, 2)
+	os.close(log)
+
+	loggers = [logging.getLogger()] + [logger for logger in logging.Logger.manager.loggerDict.values() if isinstance(logger, logging.Logger)]
+	for logger in loggers:
+		for handler in logger.handlers:
+			if isinstance(handler, logging.StreamHandler) and id(handler.stream) in streams:
+				handler.setStream(streams[id(handler.stream)])
 
 class IndiClient(PyIndi.BaseClient):
 	def __init__(self):
@@ -77,50 +163,49 @@ class IndiClient(PyIndi.BaseClient):
 	def newDevice(self, d):
 		'''Emmited when a new device is created from INDI server.'''
 		self.logger.debug(f"New device: {d.getDeviceName()}")
+		pushEquipment('device', (d.getDeviceName(), d.getDriverInterface()))
 
 	def removeDevice(self, d):
 		'''Emmited when a device is deleted from INDI server.'''
 		self.logger.debug(f"Remove device: {d.getDeviceName()}")
+		pushEquipment('remove_device', d.getDeviceName())
 
 	def newProperty(self, p):
 		'''Emmited when a new property is created for an INDI driver.'''
 		self.logger.debug(f"New property: {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
-		property = getProperty(p)
-		if property:
-			data = {'equipment': property}
-			emitEquipment(self.socketio, data)
+		record = readProperty(p)
+		pushEquipment('new', record, ('property', record.device, record.name))
 
 	def updateProperty(self, p):
 		'''Emmited when a new property value arrives from INDI server.'''
-		self.logger.debug(f"Update property: {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
-		property = getProperty(p)
-		if property:
-			data = {'equipment': property}
-			emitEquipment(self.socketio, data)
+		if self.logger.isEnabledFor(logging.DEBUG):
+			self.logger.debug(f"Update property: {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
+		update = readValues(p)
+		if update[4] == PyIndi.INDI_BLOB:
+			blobs = readBlobs(p)
+			if blobs:
+				pushEquipment('blob', (update[0], update[1], blobs), ('blob', update[0], update[1]))
+		pushEquipment('update', update, ('property', update[0], update[1]))
 
 	def removeProperty(self, p):
 		'''Emmited when a property is deleted for an INDI driver.'''
 		self.logger.debug(f"Remove property: {p.getName()} as {p.getTypeAsString()} for device {p.getDeviceName()}")
+		pushEquipment('remove', (p.getDeviceName(), p.getName()), ('property', p.getDeviceName(), p.getName()))
 
 	def newMessage(self, d, m):
 		'''Emmited when a new message arrives from INDI server.'''
 		self.logger.debug(f"New Message: {d.messageQueue(m)}")
-		# d.messageQueue(m) = "2026-01-23T17:47:34: [INFO] Telescope"
-		msg = d.messageQueue(m).split(":")
-		msg = msg[3].strip().split("]")
-		msg = msg[1].strip()
-		data = {'msg': msg }
-		emitEquipment(self.socketio, data)
+		pushEquipment('msg', parseMessage(d.getDeviceName(), d.messageQueue(m)))
 
 	def serverConnected(self):
 		'''Emmited when the server is connected.'''
 		self.logger.info(f"INDI Server connected: ({self.getHost()}:{self.getPort()})")
-		emitEquipment(self.socketio, {"connect":"true"})
+		pushEquipment('connect', None)
 
 	def serverDisconnected(self, code):
 		'''Emmited when the server gets disconnected.'''
 		self.logger.info(f"INDI Server disconnected (exit code = {code},{self.getHost()}:{self.getPort()})")
-		emitEquipment(self.socketio, {"disconnect":"true"})
+		pushEquipment('disconnect', None)
 		self.disconnectServer() # double shot REQUIRED to really disconnect and enter reconnection loop
 
 # Create an instance of IndiClient
@@ -131,27 +216,209 @@ def getEquipment(socketio, event):
 
 	indiClient.socketio = socketio # use main socket
 
-	while True:
-		if not event.is_set(): # exit on request by calling equipmentThreadEvent.clear()
-			print("Terminating equipment services")
-			break
+	socketio.start_background_task(getEquipmentBridge, socketio)
+
+	if COALESCE_WINDOW > 0:
+		socketio.start_background_task(getEquipmentUpdates, socketio)
 
-		while not indiClient.isServerConnected():
-			try:
-				with suppress_stdout_stderr():
-					indiClient.connectServer()
-				time.sleep(1)
-				if indiClient.isServerConnected():
-					indiClient.logger.info(f"INDI Server connected ({indiClient.getHost()}:{str(indiClient.getPort())})")
-				else:
-					#indiClient.logger.error(f"Cannot connect to INDI server on {indiClient.getHost()}:{str(indiClient.getPort())}. Retrying in {str(TIMEOUT)} seconds.")
-					time.sleep(TIMEOUT)
-			except Exception as err:
-				indiClient.logger.error(f"Error connecting to INDI server: {err}")
-
-		time.sleep(1)
-
-def getProperty(property):
+	redirectNativeStdio()
+
+	delay = RECONNECT_MIN
+
+	while event.is_set(): # exit on request by calling equipmentThreadEvent.clear()
+		if indiClient.isServerConnected():
+			# sleep until the bridge reports disconnection, timeout to notice exit requests
+			connectionChanged.clear()
+			if indiClient.isServerConnected():
+				connectionChanged.wait(TIMEOUT)
+			continue
+
+		connectionStats['attempts'] += 1
+		setConnectionState(socketio, 'connecting')
+		try:
+			connectServer()
+		except Exception as err:
+			indiClient.logger.error(f"Error connecting to INDI server: {err}")
+
+		if indiClient.isServerConnected():
+			delay = RECONNECT_MIN
+			connectionStats['retries'] = 0
+			connectionStats['next_retry'] = None
+			setConnectionState(socketio, 'connected')
+			continue
+
+		wait = delay * uniform(1 - RECONNECT_JITTER, 1 + RECONNECT_JITTER)
+		delay = min(delay * 2, RECONNECT_MAX)
+		connectionStats['retries'] += 1
+		connectionStats['next_retry'] = time.time() + wait
+		setConnectionState(socketio, 'waiting')
+		time.sleep(wait)
+
+	print("Terminating equipment services")
+
+def connectServer():
+	"""Connect to INDI server in a native thread, connecting blocks until timeout"""
+	try:
+		from gevent import get_hub
+	except ImportError:
+		return indiClient.connectServer()
+	return get_hub().threadpool.apply(indiClient.connectServer)
+
+def setConnectionState(socketio, state):
+	if connectionStats['state'] == state:
+		return
+	connectionStats['state'] = state
+	if state == 'connected':
+		connectionStats['connects'] += 1
+	emitEquipment(socketio, {'connection': getConnectionStats()})
+
+def getConnectionStats():
+	"""Return INDI server connection state, attempts, retries since last connection and time of next retry"""
+	stats = dict(connectionStats)
+	if stats['next_retry'] is not None:
+		stats['next_retry'] = datetime.fromtimestamp(stats['next_retry'], timezone.utc).strftime('%Y-%m-%dT%H:%M:%S%z')
+	return stats
+
+def registerDevice(name, interface):
+	"""Add device under all types of its driver interface, returns True if registry changed"""
+	interface = interface or 0
+
+	with registryLock:
+		if deviceInterfaces.get(name) == interface:
+			return False
+		for device_type in DEVICE_TYPES:
+			deviceRegistry[device_type].pop(name, None)
+		deviceInterfaces[name] = interface
+		for device_type in getDeviceTypes(interface):
+			deviceRegistry[device_type][name] = interface
+	return True
+
+def unregisterDevice(name):
+	"""Remove device from registry, returns True if it was registered"""
+	with registryLock:
+		if deviceInterfaces.pop(name, None) is None:
+			return False
+		for device_type in DEVICE_TYPES:
+			deviceRegistry[device_type].pop(name, None)
+	return True
+
+def getDevicesOfType(device_type):
+	"""Return names of devices of a type in order of registration"""
+	with registryLock:
+		return list(deviceRegistry.get(device_type, {}))
+
+def getDeviceRegistry():
+	"""Return names of devices of every type having any"""
+	with registryLock:
+		return {device_type: list(devices) for device_type, devices in deviceRegistry.items() if devices}
+
+def getTelescope(name=None):
+	"""Return telescope device of a name, first registered telescope if not given"""
+	telescopes = getDevicesOfType("TELESCOPE")
+	if name is None:
+		name = telescopes[0] if telescopes else None
+	if name not in telescopes:
+		return
+	return indiClient.getDevice(name)
+
+class PropertyRecord(object):
+	"""
+	INDI property made of plain objects, safe to use outside of the PyIndi thread
+	Metadata and element names are read once when the property is defined, updates replace
+	only state and values. Device type and version are set when the property is sent.
+	"""
+	__slots__ = ('device', 'name', 'type', 'group', 'label', 'perm', 'elements', 'labels', 'state', 'values', 'device_type', 'version')
+
+	def __init__(self, device, name, type, group, label, perm, elements, labels, state, values):
+		self.device = sys.intern(device)
+		self.name = sys.intern(name)
+		self.type = sys.intern(type)
+		self.group = sys.intern(group)
+		self.label = label
+		self.perm = perm
+		self.elements = elements
+		self.labels = labels
+		self.state = state
+		self.values = values
+		self.device_type = None
+		self.version = 0
+
+	def copy(self, state, values):
+		"""Return record with state and values of an update"""
+		record = PropertyRecord.__new__(PropertyRecord)
+		for slot in PropertyRecord.__slots__:
+			setattr(record, slot, getattr(self, slot))
+		record.state = state
+		record.values = values
+		return record
+
+def readNumbers(property):
+	return [t.value for t in property.getNumber()]
+
+def readTexts(property):
+	return [t.text for t in property.getText()]
+
+def readSwitches(property):
+	return [strISState(t.s) for t in property.getSwitch()]
+
+def readLights(property):
+	return [strIPState(t.s) for t in property.getLight()]
+
+def readBlobSizes(property):
+	return ['<blob ' + str(t.size) + ' bytes>' for t in property.getBLOB()]
+
+# elements getter and values reader of each property type
+PROPERTY_READERS = {
+	PyIndi.INDI_NUMBER: ('getNumber', readNumbers),
+	PyIndi.INDI_TEXT: ('getText', readTexts),
+	PyIndi.INDI_SWITCH: ('getSwitch', readSwitches),
+	PyIndi.INDI_LIGHT: ('getLight', readLights),
+	PyIndi.INDI_BLOB: ('getBLOB', readBlobSizes)
+}
+
+def readProperty(property):
+	"""Return record of a newly defined property"""
+	readers = PROPERTY_READERS.get(property.getType())
+	if readers is None:
+		indiClient.logger.error(f"Unknown property type ({property.getTypeAsString()})")
+		elements, labels, values = [], [], []
+	else:
+		items = getattr(property, readers[0])()
+		elements = [sys.intern(t.name) for t in items]
+		labels = [t.label for t in items]
+		values = readers[1](property)
+
+	return PropertyRecord(property.getDeviceName(), property.getName(), property.getTypeAsString(), property.getGroupName(),
+		property.getLabel(), property.getPermission(), elements, labels, property.getStateAsString(), values)
+
+def readValues(property):
+	"""Return (device, name, state, values, type) of a property update, reading element values only"""
+	type = property.getType()
+	readers = PROPERTY_READERS.get(type)
+	return (property.getDeviceName(), property.getName(), property.getStateAsString(), readers[1](property) if readers else [], type)
+
+def storeProperty(record):
+	"""Store record of a newly defined property, versions continue from a previous definition"""
+	with stateLock:
+		device = equipmentState.setdefault(record.device, {})
+		stored = device.get(record.name)
+		if stored is not None:
+			record.version = stored.version
+		device[record.name] = record
+	return record
+
+def getStoredProperty(device_name, name):
+	with stateLock:
+		return equipmentState.get(device_name, {}).get(name)
+
+def getDriverInterface(record):
+	"""Return driver interface of a device from its DRIVER_INFO property"""
+	try:
+		return int(record.values[record.elements.index("DRIVER_INTERFACE")])
+	except (ValueError, TypeError, IndexError):
+		return 0
+
+def getProperty(record):
 	"""
 	Return RFC 8259 compliant JSON assembled from properties of devices connected to INDI server
 	{ device_type:
@@ -161,126 +428,606 @@ def getProperty(property):
 				'LABEL':label,
 				'TYPE': type,
 				'STATE': state,
-				'PERM': perm
+				'PERM': perm,
+				'VERSION': version
 		  }
 		}
 	}
+	Version of the stored record is bumped, subsequent updates are sent as deltas.
+	Returns None while type of the device is not known.
 	"""
-	device_type = getDeviceType(property.getBaseDevice().getDriverInterface())
-	device_name = property.getDeviceName()
-	name = property.getName()
-	label = property.getLabel()
-	group = property.getGroupName()
-	type = property.getTypeAsString()
-	state = property.getStateAsString()
-	perm = property.getPermission()
-
-	if device_type is None or device_name is None:
+	with registryLock:
+		device_type = getDeviceType(deviceInterfaces.get(record.device))
+
+	if device_type is None:
 		return
 
-	device_data = json.loads("{}")
-	device_properties = json.loads("{}")
-	device_property = json.loads("{}")
-
-	if property.getType() == PyIndi.INDI_TEXT:
-		for t in property.getText():
-			device_property.update({t.name:[t.text, t.label]})
-			device_properties.update({name: device_property})
-	elif property.getType()==PyIndi.INDI_NUMBER:
-		for t in property.getNumber():
-			device_property.update({t.name:[t.value, t.label]})
-			device_properties.update({name: device_property})
-	elif property.getType()==PyIndi.INDI_SWITCH:
-		for t in property.getSwitch():
-			device_property.update({t.name:[strISState(t.s), t.label]})
-			device_properties.update({name: device_property})
-	elif property.getType()==PyIndi.INDI_LIGHT:
-		for t in property.getLight():
-			device_property.update({t.name:[strIPState(t.s), t.label]})
-			device_properties.update({name: device_property})
-	elif property.getType()==PyIndi.INDI_BLOB:
-		for t in property.getBLOB():
-			device_property.update({t.name:['<blob ' + str(t.size) + ' bytes>', t.label]})
-			device_properties.update({name: device_property})
+	with stateLock:
+		record.device_type = device_type
+		record.version += 1
+		return formatProperty(record)
+
+def formatProperty(record):
+	"""Return stored record in the format of getProperty"""
+	device_properties = {record.name: {element: [value, label] for element, value, label in zip(record.elements, record.values, record.labels)}}
+	device_properties['GROUP'] = record.group
+	device_properties['LABEL'] = record.label
+	device_properties['TYPE'] = record.type
+	device_properties['STATE'] = record.state
+	device_properties['PERM'] = record.perm
+	device_properties['VERSION'] = record.version
+
+	return {record.device_type: {record.device: device_properties}}
+
+def getPropertyDelta(record, state, values):
+	"""
+	Store state and values of an update, return element values and state changed since last sent
+	{ 'TYPE': device_type,
+	  'DEVICE': device_name,
+	  'PROPERTY': property_name,
+	  'VERSION': version,
+	  'VALUES': { element_name: value },
+	  'STATE': state
+	}
+	Returns None if nothing changed or the property was not sent yet.
+	"""
+	if len(values) != len(record.elements):
+		return # elements change only with a new definition
+
+	with stateLock:
+		changed = {element: value for element, value, previous in zip(record.elements, values, record.values) if value != previous}
+		sent = record.device_type is not None and (changed or state != record.state)
+
+		record.values = values
+		record.state = state
+		if not sent:
+			return
+
+		record.version += 1
+		return {'TYPE': record.device_type, 'DEVICE': record.device, 'PROPERTY': record.name, 'VERSION': record.version, 'VALUES': changed, 'STATE': state}
+
+def getEquipmentSnapshot(device_name=None, name=None, filters=None):
+	"""Return stored properties, of a device or a single property if given, matching any of filters if given"""
+	with registryLock:
+		interfaces = dict(deviceInterfaces)
+
+	snapshot = []
+	with stateLock:
+		for device, properties in equipmentState.items():
+			if device_name is not None and device != device_name:
+				continue
+			for property, record in properties.items():
+				if name is not None and property != name:
+					continue
+				if record.device_type is None:
+					continue # not sent yet
+				if filters is not None and not any(matchFilter(f, getDeviceTypes(interfaces.get(device)) or [record.device_type], device, record.group) for f in filters):
+					continue
+				snapshot.append({'equipment': formatProperty(record)})
+	return snapshot
+
+def emitEquipmentSnapshot(socketio, to, filters=None):
+	"""Send stored properties a client is subscribed to, only those matching filters if given"""
+	if filters is None:
+		emitEquipment(socketio, {'connection': getConnectionStats()}, to)
+		emitEquipment(socketio, {'devices': getDeviceRegistry()}, to)
+		filters = getSubscriptions(to)
+
+	snapshot = getEquipmentSnapshot(filters=filters)
+	if snapshot:
+		emitEquipment(socketio, {'batch': snapshot}, to)
+
+def resyncEquipment(socketio, data, to=None):
+	"""Send stored properties to a client that missed a delta, all properties of a device if property is not given"""
+	if "device" not in data:
+		return
+
+	snapshot = getEquipmentSnapshot(data["device"], data.get("property"), getSubscriptions(to) if to else None)
+	if snapshot:
+		emitEquipment(socketio, {'batch': snapshot}, to)
+
+def getFilter(data):
+	"""Return filter of a subscription request {type, device, group}, missing keys match any"""
+	device_type = data.get("type") or None
+	if device_type is not None and device_type not in DEVICE_TYPES:
+		raise ValueError(f"Unknown device type {device_type}")
+	return (device_type, data.get("device") or None, data.get("group") or None)
+
+def getSubscriptionRoom(filter):
+	return 'equipment:' + json.dumps(filter)
+
+def matchFilter(filter, device_types, device, group):
+	"""Return True if filter matches property of a group of a device, group None (of messages) matches any"""
+	return (filter[0] is None or filter[0] in device_types) and (filter[1] is None or filter[1] == device) and (filter[2] is None or group is None or filter[2] == group)
+
+def subscribeEquipment(sid, filters):
+	"""Add filters to subscriptions of a client, returns filters not subscribed before"""
+	filters = [getFilter(f) for f in filters]
+	added = []
+	with subscriptionLock:
+		subscribed = subscriptions.setdefault(sid, set())
+		for f in filters:
+			if f in subscribed:
+				continue
+			subscribed.add(f)
+			subscribedFilters[f] = subscribedFilters.get(f, 0) + 1
+			added.append(f)
+	return added
+
+def unsubscribeEquipment(sid, filters=None):
+	"""Remove filters from subscriptions of a client, all if not given, returns rooms to leave"""
+	removed = []
+	with subscriptionLock:
+		subscribed = subscriptions.get(sid, set())
+		for f in list(subscribed) if filters is None else [getFilter(f) for f in filters]:
+			if f not in subscribed:
+				continue
+			subscribed.discard(f)
+			subscribedFilters[f] -= 1
+			if not subscribedFilters[f]:
+				del subscribedFilters[f]
+			removed.append(getSubscriptionRoom(f))
+		if not subscribed:
+			subscriptions.pop(sid, None)
+	return removed
+
+def getSubscriptions(sid):
+	with subscriptionLock:
+		return list(subscriptions.get(sid, ()))
+
+def getSubscriptionRooms(device, group=None, device_type=None):
+	"""Return rooms of filters matching properties of a group of a device, any group if not given"""
+	with registryLock:
+		device_types = getDeviceTypes(deviceInterfaces.get(device)) or [device_type]
+	with subscriptionLock:
+		return [getSubscriptionRoom(f) for f in subscribedFilters if matchFilter(f, device_types, device, group)]
+
+def getPropertyRooms(device, name):
+	"""Return rooms subscribed to a stored property"""
+	record = getStoredProperty(device, name)
+	if record is None or record.device_type is None:
+		return []
+	return getSubscriptionRooms(device, record.group, record.device_type)
+
+def pushEquipment(kind, data, key=None):
+	"""Queue INDI callback for the bridge, called from the PyIndi thread"""
+	global bridgeGeneration
+
+	with bridgeLock:
+		bridgeStats['callbacks'] += 1
+
+		if kind in ('connect', 'disconnect', 'device', 'remove_device'):
+			bridgeGeneration += 1
+
+		if key is None:
+			key = ('event', next(bridgeSequence))
+		else:
+			key = (bridgeGeneration,) + key
+
+		pending = bridgeItems.get(key)
+		superseded = None
+		if pending is not None:
+			# replace pending item of the property, a new property stays new
+			bridgeStats['superseded'] += 1
+			if pending[0] == 'new' and kind == 'update':
+				kind = 'new'
+				data = pending[1].copy(data[2], data[3])
+			elif pending[0] == 'blob':
+				superseded = pending[1][2]
+			bridgeItems[key] = [kind, data, pending[2]]
+		else:
+			bridgeItems[key] = [kind, data, time.time()]
+			bridgeOrder.append(key)
+
+		if kind == 'msg':
+			bridgeMessages.append(key)
+			while len(bridgeMessages) > BRIDGE_MESSAGES:
+				if bridgeItems.pop(bridgeMessages.popleft(), None) is not None:
+					bridgeStats['dropped'] += 1
+
+		bridgeStats['max_queued'] = max(bridgeStats['max_queued'], len(bridgeItems))
+
+	if superseded:
+		removeBlobs(superseded)
+
+	if bridgeWatcher is not None:
+		bridgeWatcher.send() # wake up the bridge, safe from any thread
+
+def getEquipmentBridge(socketio):
+	"""Drain INDI callbacks queued by the PyIndi thread whenever the async watcher fires"""
+	global bridgeWatcher
+	from gevent import get_hub
+
+	wakeup = Event()
+	watcher = get_hub().loop.async_()
+	watcher.start(wakeup.set)
+	bridgeWatcher = watcher
+
+	while True:
+		wakeup.wait(1) # timeout as a safety net only
+		wakeup.clear()
+		drainEquipment(socketio)
+
+def drainEquipment(socketio):
+	"""Process queued INDI callbacks, called by the bridge greenlet only"""
+	while True:
+		with bridgeLock:
+			if not bridgeOrder:
+				break
+			key = bridgeOrder.popleft()
+			item = bridgeItems.pop(key, None)
+		if item is None:
+			continue # dropped message
+
+		latency = time.time() - item[2]
+		bridgeStats['processed'] += 1
+		bridgeStats['latency'] += latency
+		bridgeStats['latency_max'] = max(bridgeStats['latency_max'], latency)
+
+		try:
+			processEquipment(socketio, item[0], item[1])
+		except Exception as e:
+			indiClient.logger.error(f"Error processing INDI {item[0]}: {e}")
+
+def processEquipment(socketio, kind, data):
+	"""Update equipment state from an INDI callback and send changes"""
+	if kind == 'device':
+		if registerDevice(*data):
+			emitEquipment(socketio, {'devices': getDeviceRegistry()})
+			queueDeviceProperties(socketio, data[0])
+		if data[0] in blobSubscribers:
+			setBlobMode(data[0]) # server forgets BLOB subscriptions on reconnect
+
+	elif kind == 'remove_device':
+		if unregisterDevice(data):
+			emitEquipment(socketio, {'devices': getDeviceRegistry()})
+		with stateLock:
+			equipmentState.pop(data, None)
+
+	elif kind in ('new', 'update'):
+		if kind == 'new':
+			record = storeProperty(data)
+			delta = None
+		else:
+			record = getStoredProperty(data[0], data[1])
+			if record is None:
+				return # removed meanwhile
+			delta = getPropertyDelta(record, data[2], data[3])
+
+		key = (record.device, record.name)
+		registered = record.name == "DRIVER_INFO" and registerDevice(record.device, getDriverInterface(record)) # driver interface is known
+		if registered:
+			emitEquipment(socketio, {'devices': getDeviceRegistry()})
+
+		if delta:
+			queueEquipment(socketio, key, {'delta': delta})
+		elif kind == 'new' or record.device_type is None:
+			property = getProperty(record)
+			if property:
+				queueEquipment(socketio, key, {'equipment': property})
+
+		if registered:
+			queueDeviceProperties(socketio, record.device)
+
+	elif kind == 'remove':
+		with stateLock:
+			if data[0] in equipmentState:
+				equipmentState[data[0]].pop(data[1], None)
+
+	elif kind == 'blob':
+		queueBlob(socketio, *data)
+
+	elif kind == 'msg':
+		message = storeMessage(data)
+		flushEquipment(socketio)
+		rooms = getSubscriptionRooms(message['device'])
+		if rooms:
+			emitEquipment(socketio, {'msg': message['text'], 'message': message}, rooms)
+
+	elif kind == 'connect':
+		flushEquipment(socketio)
+		emitEquipment(socketio, {"connect":"true"})
+
+	elif kind == 'disconnect':
+		flushEquipment(socketio)
+		emitEquipment(socketio, {"disconnect":"true"})
+		connectionStats['disconnects'] += 1
+		setConnectionState(socketio, 'disconnected')
+		connectionChanged.set() # wake up the supervisor
+		with stateLock:
+			equipmentState.clear()
+		with registryLock:
+			for devices in deviceRegistry.values():
+				devices.clear()
+			deviceInterfaces.clear()
+
+def getBridgeStats():
+	"""Return INDI callbacks queued, replaced, dropped and processed, queue depth and latency in milliseconds"""
+	processed = max(bridgeStats['processed'], 1)
+	return {
+		'callbacks': bridgeStats['callbacks'],
+		'superseded': bridgeStats['superseded'],
+		'dropped': bridgeStats['dropped'],
+		'processed': bridgeStats['processed'],
+		'queued': len(bridgeItems),
+		'max_queued': bridgeStats['max_queued'],
+		'latency_avg': "%.2f" % (bridgeStats['latency'] / processed * 1000),
+		'latency_max': "%.2f" % (bridgeStats['latency_max'] * 1000)
+	}
+
+def parseMessage(device, message):
+	"""
+	Return (timestamp, device, severity, text) of an INDI message
+	d.messageQueue(m) = "2026-01-23T17:47:34: [INFO] Telescope is parked: yes"
+	"""
+	match = MESSAGE_FORMAT.match(message)
+	if match:
+		timestamp = match.group('timestamp')
+		severity = match.group('severity') or 'INFO'
+		text = match.group('text').strip()
 	else:
-		IndiClient.logger.error(f"Unknown property type ({type})")
+		timestamp = datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+		severity = 'INFO'
+		text = message.strip()
 
-	device_properties.update({'GROUP': group, 'LABEL':label, 'TYPE': type, 'STATE': state, 'PERM': perm})
+	if severity == 'WARN':
+		severity = 'WARNING'
 
-	device_data.update({device_type: { device_name: device_properties }})
+	return (timestamp, device, severity, text)
 
-	return device_data
+def storeMessage(message):
+	timestamp, device, severity, text = message
+	message = {'id': next(messageSequence), 'timestamp': timestamp, 'device': device, 'severity': severity, 'text': text}
+	messages.append(message)
+	return message
 
-def getJSON(devices):
+def getSeverityLevel(severity):
+	return SEVERITIES.index(severity) if severity in SEVERITIES else SEVERITIES.index('INFO')
+
+def getMessages(before=None, limit=MESSAGES_PAGE, severity=None):
 	"""
-	Return RFC 8259 compliant JSON assembled from properties of devices connected to INDI server
-	{ device_type:
-		{ device_name:
-		  {	property_name: [value, label],
-				'GROUP': group,
-				'LABEL':label,
-				'TYPE': type,
-				'STATE': state,
-				'PERM': perm
-		  }
-		}
-	}
-        """
+	Return page of stored messages, oldest first
+	Page holds the newest messages older than id before (if given) of at least severity (if given).
+	"""
+	level = getSeverityLevel(severity) if severity else 0
+	page = []
+	more = False
+
+	for message in reversed(messages):
+		if before is not None and message['id'] >= before:
+			continue
+		if getSeverityLevel(message['severity']) < level:
+			continue
+		if len(page) == limit:
+			more = True
+			break
+		page.append(message)
 
-	if not devices:
+	page.reverse()
+	return {'messages': page, 'more': more}
+
+def emitMessages(socketio, data, to):
+	"""Send page of message history to a client"""
+	try:
+		limit = min(int(data.get("limit", MESSAGES_PAGE)), MESSAGES_SIZE)
+		before = int(data["before"]) if data.get("before") is not None else None
+	except (TypeError, ValueError):
 		return
+	emitEquipment(socketio, getMessages(before, limit, data.get("severity")), to)
 
-	equipment = json.loads("{}")
+def getBlobRoom(device):
+	return 'blob:' + device
 
-	for device in devices:
-		if device.getDriverInterface():
-			device_type = getDeviceType(device.getDriverInterface())
+def setBlobs(device, enable, sid):
+	"""Subscribe client to BLOB previews of a device, BLOBs are enabled while it has subscribers"""
+	with blobLock:
+		subscribers = blobSubscribers.setdefault(device, set())
+		if enable:
+			subscribers.add(sid)
 		else:
+			subscribers.discard(sid)
+		if not subscribers:
+			del blobSubscribers[device]
+			blobFrames.pop(device, None)
+
+	setBlobMode(device)
+
+def setBlobMode(device):
+	"""Ask INDI server for BLOBs of a device while it has subscribers"""
+	with blobLock:
+		active = device in blobSubscribers
+
+	if indiClient.isServerConnected():
+		indiClient.setBLOBMode(PyIndi.B_ALSO if active else PyIndi.B_NEVER, device, None)
+
+def unsubscribeBlobs(sid):
+	with blobLock:
+		devices = [device for device, subscribers in blobSubscribers.items() if sid in subscribers]
+	for device in devices:
+		setBlobs(device, False, sid)
+
+def readBlobs(property):
+	"""
+	Return (name, path, format) of BLOBs of a property if anyone wants their preview
+	PyIndi reuses the buffer after the callback, so it is written to a file straight from a
+	memoryview. Workers map the file instead of receiving a pickled copy and remove it.
+	"""
+	device = property.getDeviceName()
+	frame = blobFrames.get(device, [0, False])
+	if device not in blobSubscribers or frame[1] or time.time() - frame[0] < 1.0 / BLOB_RATE:
+		return # checked again by the bridge, this only saves the copy
+
+	blobs = []
+	for t in property.getBLOB():
+		if t.size == 0 or t.size > BLOB_SIZE:
 			continue
+		blob = (t.name, None, t.format)
+		try:
+			with tempfile.NamedTemporaryFile(dir=BLOB_PATH, prefix='astroberry-blob-', delete=False) as f:
+				blob = (t.name, f.name, t.format)
+				f.write(memoryview(t.getblobdata())[:t.size])
+		except OSError as e:
+			indiClient.logger.error(f"Storing BLOB {device}.{t.name} failed: {e}")
+			removeBlobs([blob])
+			continue
+		blobs.append(blob)
+	return blobs
+
+def removeBlobs(blobs):
+	for name, path, format in blobs:
+		try:
+			if path:
+				os.remove(path)
+		except OSError:
+			pass
+
+def queueBlob(socketio, device, name, blobs):
+	"""Make previews of BLOBs in a worker and send them to subscribers of the device"""
+	now = time.time()
 
-		device_name = device.getDeviceName()
-		device_data = json.loads("{}")
-		properties = device.getProperties()
-		device_properties = json.loads("{}")
-
-		for property in properties:
-			device_property = json.loads("{}")
-			property_name = property.getName()
-			if property.getType() == PyIndi.INDI_TEXT:
-				for t in property.getText():
-					device_property.update({t.name:[t.text, t.label]})
-					device_properties.update({property_name: device_property})
-			elif property.getType()==PyIndi.INDI_NUMBER:
-				for t in property.getNumber():
-					device_property.update({t.name:[t.value, t.label]})
-					device_properties.update({property_name: device_property})
-			elif property.getType()==PyIndi.INDI_SWITCH:
-				for t in property.getSwitch():
-					device_property.update({t.name:[strISState(t.s), t.label]})
-					device_properties.update({property_name: device_property})
-			elif property.getType()==PyIndi.INDI_LIGHT:
-				for t in property.getLight():
-					device_property.update({t.name:[strIPState(t.s), t.label]})
-					device_properties.update({property_name: device_property})
-			elif property.getType()==PyIndi.INDI_BLOB:
-				for t in property.getBLOB():
-					device_property.update({t.name:['<blob ' + str(t.size) + ' bytes>', t.label]})
-					device_properties.update({property_name: device_property})
-
-		device_data.update({device_name: device_properties})
-
-		# Handle multiple devices of a type
-		if device_type in equipment.keys():
-			existing_device_type_json = equipment[device_type]
-			existing_device_type_json.update(device_data)
+	with blobLock:
+		if device not in blobSubscribers:
+			removeBlobs(blobs)
+			return
+		frame = blobFrames.setdefault(device, [0, False])
+		if frame[1] or now - frame[0] < 1.0 / BLOB_RATE:
+			countEquipment('blobs_dropped')
+			removeBlobs(blobs)
+			return
+		frame[0] = now
+		frame[1] = True
+
+	jobs = []
+	for element, path, format in blobs:
+		jobs.append((element, submitJob(getPreviewFile, path, format)))
+
+	if not jobs:
+		with blobLock:
+			frame[1] = False
+		return
+
+	def done(job):
+		with blobLock:
+			frame[1] = not all(job.done() for element, job in jobs)
+
+	for element, job in jobs:
+		job.add_done_callback(done)
+		job.add_done_callback(lambda job, element=element: emitBlob(socketio, device, name, element, job))
+
+def emitBlob(socketio, device, property, element, job):
+	try:
+		preview = job.result()
+	except Exception as e:
+		indiClient.logger.error(f"BLOB preview failed: {e}")
+		return
+
+	if not preview:
+		return
+
+	image, format, width, height = preview
+	countEquipment('blobs')
+	socketio.emit('equipment_blob', {
+		'device': device,
+		'property': property,
+		'element': element,
+		'format': format,
+		'width': width,
+		'height': height,
+		'image': image # sent as binary attachment
+	}, to=getBlobRoom(device))
+
+def getEquipmentUpdates(socketio):
+	while True:
+		time.sleep(COALESCE_WINDOW)
+		flushEquipment(socketio)
+
+def queueDeviceProperties(socketio, device):
+	"""Queue properties of a device held back while its type was not known, once it is"""
+	with stateLock:
+		records = [record for record in equipmentState.get(device, {}).values() if record.device_type is None]
+
+	for record in records:
+		property = getProperty(record)
+		if property:
+			queueEquipment(socketio, (record.device, record.name), {'equipment': property})
+
+def queueEquipment(socketio, key, data):
+	"""Queue property update for next message, replacing or merging with pending update of the property"""
+	countEquipment('updates')
+
+	if COALESCE_WINDOW <= 0:
+		rooms = getPropertyRooms(*key)
+		if rooms:
+			emitEquipment(socketio, data, rooms)
+		return
+
+	with pendingLock:
+		pending = pendingUpdates.get(key)
+		if pending is None:
+			pendingUpdates[key] = data
+		else:
+			pendingUpdates[key] = mergeUpdates(pending, data)
+			equipmentStats['coalesced'] += 1
+
+def mergeUpdates(pending, data):
+	"""Merge property update into pending update of the same property"""
+	if 'delta' not in data:
+		return data # full property replaces anything pending
+
+	delta = data['delta']
+
+	if 'delta' in pending:
+		merged = dict(pending['delta'])
+		merged['BASE'] = merged.get('BASE', merged['VERSION'] - 1) # version the client must have
+		merged['VALUES'] = dict(merged['VALUES'])
+		merged['VALUES'].update(delta['VALUES'])
+		merged['VERSION'] = delta['VERSION']
+		merged['STATE'] = delta['STATE']
+		return {'delta': merged}
+
+	# apply delta to pending full property
+	properties = pending['equipment'][delta['TYPE']][delta['DEVICE']]
+	for element, value in delta['VALUES'].items():
+		properties[delta['PROPERTY']][element][0] = value
+	properties['STATE'] = delta['STATE']
+	properties['VERSION'] = delta['VERSION']
+	return pending
+
+def flushEquipment(socketio):
+	"""Send pending property updates in one message to each set of subscribed rooms, updates nobody subscribed to are not sent"""
+	with pendingLock:
+		if not pendingUpdates:
+			return
+		updates = list(pendingUpdates.items())
+		pendingUpdates.clear()
+
+	routes = OrderedDict() # rooms -> updates
+	for key, update in updates:
+		rooms = tuple(getPropertyRooms(*key))
+		if rooms:
+			routes.setdefault(rooms, []).append(update)
+
+	for rooms, updates in routes.items():
+		if len(updates) == 1:
+			emitEquipment(socketio, updates[0], list(rooms))
 		else:
-			equipment.update({device_type: device_data})
+			emitEquipment(socketio, {'batch': updates}, list(rooms))
 
-	return equipment
+def countEquipment(counter):
+	with pendingLock:
+		equipmentStats[counter] += 1
 
-def emitEquipment(socketio, data):
+def getEquipmentStats():
+	"""Return INDI callbacks received, property updates queued, updates coalesced, messages emitted and BLOB previews sent/dropped"""
+	with pendingLock:
+		stats = dict(equipmentStats)
+	stats['callbacks'] = bridgeStats['callbacks']
+	return stats
+
+def emitEquipment(socketio, data, to=None):
 	if socketio and data:
-		socketio.emit('equipment', data )
+		countEquipment('messages')
+		socketio.emit('equipment', data, to=to)
 	else:
 		print(data)
 
@@ -300,47 +1047,17 @@ def strIPState(s):
 	elif (s == PyIndi.IPS_ALERT):
 		return "ALERT"
 
-# Based on https://github.com/indilib/indi/blob/master/libs/indidevice/basedevice.h#L83
 def getDeviceType(s):
-	if s is None:
-		return
+	"""Return first type of a driver interface, None for general devices"""
+	device_types = getDeviceTypes(s)
+	if device_types:
+		return device_types[0]
 
-	if s & 0:
-		return "GENERAL"
-	elif s & (1 << 0):
-		return "TELESCOPE"
-	elif s & (1 << 1):
-		return "CCD"
-	elif s & (1 << 2):
-		return "GUIDER"
-	elif s & (1 << 3):
-		return "FOCUSER"
-	elif s & (1 << 4):
-		return "FILTER"
-	elif s & (1 << 5):
-		return "DOME"
-	elif s & (1 << 6):
-		return "GPS"
-	elif s & (1 << 7):
-		return "WEATHER"
-	elif s & (1 << 8):
-		return "AO"
-	elif s & (1 << 9):
-		return "DUSTCAP"
-	elif s & (1 << 10):
-		return "LIGHTBOX"
-	elif s & (1 << 11):
-		return "DETECTOR"
-	elif s & (1 << 12):
-		return "ROTATOR"
-	elif s & (1 << 13):
-		return "SPECTROGRAPH"
-	elif s & (1 << 14):
-		return "CORRELATOR"
-	elif s & (1 << 15):
-		return "AUX"
-	else:
-		return
+def getDeviceTypes(s):
+	"""Return all types of a driver interface"""
+	if s is None:
+		return []
+	return [device_type for bit, device_type in enumerate(DEVICE_TYPES) if s & (1 << bit)]
 
 def setEquipment(data): # POC: set telescope location & goto coordinates
 	if not indiClient:
@@ -349,18 +1066,14 @@ def setEquipment(data): # POC: set telescope location & goto coordinates
 
 	if "ra" in data and "dec" in data:
 		try:
-			devices = indiClient.getDevices() # always get fresh list of devices
-			for device in devices:
-				if getDeviceType(device.getDriverInterface()) == "TELESCOPE":
-					telescope = device.getDeviceName()
-					break # use first seen telescope
-
-			device = indiClient.getDevice(telescope)
+			device = getTelescope(data.get("device")) # requested telescope or first registered
 
 			if not (device) or not (device.isConnected()):
 				print("Setting telescope coordinates aborted. No telescope device found or telescope is not connected.")
 				return
 
+			telescope = device.getDeviceName()
+
 			if data["ra"] < 0 or data["ra"] > 360 or data["dec"] < -90 or data["dec"] > 90:
 				print("Setting telescope coordinates aborted. Invalid coordinates requested.")
 				return
@@ -371,11 +1084,10 @@ def setEquipment(data): # POC: set telescope location & goto coordinates
 			longitude = observer[1].getValue()
 			elevation = observer[2].getValue()
 
-			# Check if not below horizon
-			azalt = getAzAlt([data['ra'], data['dec']], [latitude, longitude, elevation])
-			alt = int(azalt[1].split(":")[0]) + int(azalt[1].split(":")[1])/60 + float(azalt[1].split(":")[2])/3600
-			if alt < 0:
-				print("Setting telescope coordinates aborted. Requested coordinates below horizon")
+			# Check if not below horizon profile
+			check = checkHorizon([data['ra']], [data['dec']], latitude, longitude, elevation)
+			if not check['visible'][0]:
+				print("Setting telescope coordinates aborted. Requested coordinates below horizon (alt: %.2f horizon: %.2f)" % (check['alt'][0], check['horizon'][0]))
 				return
 
 			# Send slew command to telescope
@@ -400,18 +1112,14 @@ def setEquipment(data): # POC: set telescope location & goto coordinates
 
 	if "latitude" in data and "longitude" in data:
 		try:
-			devices = indiClient.getDevices() # always get fresh list of devices
-			for device in devices:
-				if getDeviceType(device.getDriverInterface()) == "TELESCOPE":
-					telescope = device.getDeviceName()
-					break # use first seen telescope
-
-			device = indiClient.getDevice(telescope)
+			device = getTelescope(data.get("device")) # requested telescope or first registered
 
 			if not (device) or not (device.isConnected()):
 				print("Setting telescope location aborted. No telescope device found or telescope is not connected.")
 				return
 
+			telescope = device.getDeviceName()
+
 			if data["latitude"] < -90 or data["latitude"] > 90 or data["longitude"] < 0 or data["longitude"] > 360:
 				print("Setting telescope location aborted. Invalid location requested.")
 				return
@@ -437,24 +1145,3 @@ def setEquipment(data): # POC: set telescope location & goto coordinates
 		except Exception as e:
 			print(e)
 			pass
-
-# TODO: Fix ephem returning slightly different altitude than celestial map
-def getAzAlt(coordinates, location, time = None):
-	if not time:
-		time = datetime.now(timezone.utc)
-
-	# define target
-	target = ephem.FixedBody()
-	target._ra = coordinates[0] * ephem.degree
-	target._dec = coordinates[1] * ephem.degree
-
-	# define observer
-	observer = ephem.Observer()
-	observer.lat = location[0] * ephem.degree
-	observer.lon = location[1] * ephem.degree
-	observer.elevation = location[2]
-	observer.date = time
-	target.compute(observer)
-	#alt_norefract = ephem.unrefract(0, 0, target.alt)
-
-	return(str(target.az), str(target.alt))
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Local INDI server stand-in replaying recorded sessions
+
+python -m astroberry_manager.indisim [--port PORT] [--speed SPEED] [--loop] [SESSION ...]
+python -m astroberry_manager.indisim --record FILE [--host HOST] [--port PORT] [--duration SECONDS]
+
+Sessions are mount (slew), ccd (exposure and frame) and focuser (focuser run), or files
+recorded from a real INDI server. Each client gets the session from the start once it
+sends getProperties, SPEED times faster than recorded, SPEED 0 sends it at once.
+Does not depend on the rest of the package, so it can run as a plain script.
+"""
+
+import sys, time, json, heapq, socket, socketserver, threading, struct, base64
+from datetime import datetime, timezone
+from xml.sax.saxutils import quoteattr
+
+INDI_PORT = 7625 # next to the real INDI server
+SPEED = 1.0
+DURATION = 60
+
+MOUNT_DEVICE = 'Telescope Simulator'
+CCD_DEVICE = 'CCD Simulator'
+FOCUSER_DEVICE = 'Focuser Simulator'
+
+# driver interface bits as in INDI
+TELESCOPE_INTERFACE = 1
+CCD_INTERFACE = 2
+GUIDER_INTERFACE = 4
+FOCUSER_INTERFACE = 8
+
+def getTimestamp(offset=0):
+    return datetime.fromtimestamp(time.time() + offset, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S')
+
+def getAttributes(attributes):
+    return ''.join(' %s=%s' % (name, quoteattr(str(value))) for name, value in attributes.items())
+
+def defVector(kind, device, name, label, group, elements, state='Idle', perm='rw', **attributes):
+    """Return def*Vector, elements are (name, label, value, attributes)"""
+    xml = '<def%sVector%s>' % (kind, getAttributes(dict(device=device, name=name, label=label, group=group, state=state, perm=perm, timeout=60, timestamp=getTimestamp(), **attributes)))
+    for element, element_label, value, element_attributes in elements:
+        if value is None:
+            xml += '<def%s%s/>' % (kind, getAttributes(dict(name=element, label=element_label, **element_attributes)))
+        else:
+            xml += '<def%s%s>%s</def%s>' % (kind, getAttributes(dict(name=element, label=element_label, **element_attributes)), value, kind)
+    return xml + '</def%sVector>' % kind
+
+def setVector(kind, device, name, values, state='Ok', offset=0):
+    xml = '<set%sVector%s>' % (kind, getAttributes(dict(device=device, name=name, state=state, timeout=60, timestamp=getTimestamp(offset))))
+    for element, value in values.items():
+        xml += '<one%s%s>%s</one%s>' % (kind, getAttributes(dict(name=element)), value, kind)
+    return xml + '</set%sVector>' % kind
+
+def getMessage(device, message, offset=0):
+    return '<message%s/>' % getAttributes(dict(device=device, timestamp=getTimestamp(offset), message=message))
+
+def getNumber(name, label, value, minimum, maximum, format='%g'):
+    return (name, label, value, {'format': format, 'min': minimum, 'max': maximum, 'step': 0})
+
+def getDevice(device, interface):
+    """Return definitions every INDI driver sends"""
+    return [
+        defVector('Switch', device, 'CONNECTION', 'Connection', 'Main Control', [
+            ('CONNECT', 'Connect', 'On', {}),
+            ('DISCONNECT', 'Disconnect', 'Off', {})
+        ], state='Ok', rule='OneOfMany'),
+        defVector('Text', device, 'DRIVER_INFO', 'Driver Info', 'General Info', [
+            ('DRIVER_NAME', 'Name', device, {}),
+            ('DRIVER_EXEC', 'Exec', 'indi_simulator', {}),
+            ('DRIVER_VERSION', 'Version', '1.0', {}),
+            ('DRIVER_INTERFACE', 'Interface', interface, {})
+        ], perm='ro')
+    ]
+
+def getMountSession(rate=10, duration=20):
+    """Slew across the sky reporting coordinates at rate Hz, then track"""
+    session = [(0, xml) for xml in getDevice(MOUNT_DEVICE, TELESCOPE_INTERFACE)]
+    session.append((0, defVector('Number', MOUNT_DEVICE, 'EQUATORIAL_EOD_COORD', 'Eq. Coordinates', 'Main Control', [
+        getNumber('RA', 'RA (hh:mm:ss)', 0, 0, 24, '%010.6m'),
+        getNumber('DEC', 'DEC (dd:mm:ss)', 90, -90, 90, '%010.6m')
+    ])))
+    session.append((0, defVector('Number', MOUNT_DEVICE, 'HORIZONTAL_COORD', 'Horizontal Coordinates', 'Main Control', [
+        getNumber('AZ', 'AZ D:M:S', 0, 0, 360, '%010.6m'),
+        getNumber('ALT', 'ALT  D:M:S', 52, -90, 90, '%010.6m')
+    ], perm='ro')))
+    session.append((0, defVector('Switch', MOUNT_DEVICE, 'TELESCOPE_TRACK_STATE', 'Tracking', 'Main Control', [
+        ('TRACK_ON', 'On', 'Off', {}),
+        ('TRACK_OFF', 'Off', 'On', {})
+    ], rule='OneOfMany')))
+
+    session.append((0.5, getMessage(MOUNT_DEVICE, '[INFO] Slewing to RA: 05:35:17 - DEC: -05:23:28', 0.5)))
+    steps = int(rate * duration)
+    for i in range(1, steps + 1):
+        offset = 0.5 + i / rate
+        state = 'Busy' if i < steps else 'Ok'
+        session.append((offset, setVector('Number', MOUNT_DEVICE, 'EQUATORIAL_EOD_COORD', {'RA': 5.588 * i / steps, 'DEC': 90 - 95.391 * i / steps}, state, offset)))
+        session.append((offset, setVector('Number', MOUNT_DEVICE, 'HORIZONTAL_COORD', {'AZ': 180.0 * i / steps, 'ALT': 52 - 20.0 * i / steps}, state, offset)))
+
+    offset = 0.5 + duration
+    session.append((offset, getMessage(MOUNT_DEVICE, '[INFO] Slew is complete. Tracking...', offset)))
+    session.append((offset, setVector('Switch', MOUNT_DEVICE, 'TELESCOPE_TRACK_STATE', {'TRACK_ON': 'On', 'TRACK_OFF': 'Off'}, 'Busy', offset)))
+    return session
+
+def getFITS(width, height):
+    """Return 16-bit FITS frame with a gradient and a star"""
+    header = ''.join('%-80s' % card for card in [
+        'SIMPLE  =                    T', 'BITPIX  =                   16', 'NAXIS   =                    2',
+        'NAXIS1  = %20d' % width, 'NAXIS2  = %20d' % height, 'BZERO   =                32768', 'END'
+    ])
+    header += ' ' * (-len(header) % 2880)
+    pixels = [(x + y) * 8 - 32768 for y in range(height) for x in range(width)]
+    pixels[height // 2 * width + width // 2] = 32767
+    data = struct.pack('>%dh' % len(pixels), *pixels)
+    data += b'\0' * (-len(data) % 2880)
+    return header.encode('ascii') + data
+
+def getCcdSession(exposure=10, frames=2, width=320, height=240):
+    """Cool down, then take frames counting exposure down every second"""
+    session = [(0, xml) for xml in getDevice(CCD_DEVICE, CCD_INTERFACE | GUIDER_INTERFACE)]
+    session.append((0, defVector('Number', CCD_DEVICE, 'CCD_EXPOSURE', 'Expose', 'Main Control', [
+        getNumber('CCD_EXPOSURE_VALUE', 'Duration (s)', 1, 0.001, 3600, '%5.2f')
+    ])))
+    session.append((0, defVector('Number', CCD_DEVICE, 'CCD_TEMPERATURE', 'Temperature', 'Main Control', [
+        getNumber('CCD_TEMPERATURE_VALUE', 'Temperature (C)', 20, -50, 50, '%5.2f')
+    ])))
+    session.append((0, defVector('BLOB', CCD_DEVICE, 'CCD1', 'Image Data', 'Image Info', [
+        ('CCD1', 'Image', None, {})
+    ], perm='ro')))
+
+    frame = base64.b64encode(getFITS(width, height)).decode('ascii')
+    offset = 0
+    for i in range(frames):
+        session.append((offset, getMessage(CCD_DEVICE, '[INFO] Starting %d sec exposure: frame %d' % (exposure, i + 1), offset)))
+        for remaining in range(exposure, 0, -1):
+            session.append((offset, setVector('Number', CCD_DEVICE, 'CCD_EXPOSURE', {'CCD_EXPOSURE_VALUE': remaining}, 'Busy', offset)))
+            session.append((offset, setVector('Number', CCD_DEVICE, 'CCD_TEMPERATURE', {'CCD_TEMPERATURE_VALUE': max(20 - offset, -10)}, 'Busy', offset)))
+            offset += 1
+        session.append((offset, setVector('Number', CCD_DEVICE, 'CCD_EXPOSURE', {'CCD_EXPOSURE_VALUE': 0}, 'Ok', offset)))
+        session.append((offset, '<setBLOBVector%s><oneBLOB%s>%s</oneBLOB></setBLOBVector>' % (
+            getAttributes(dict(device=CCD_DEVICE, name='CCD1', state='Ok', timestamp=getTimestamp(offset))),
+            getAttributes(dict(name='CCD1', size=len(base64.b64decode(frame)), format='.fits')), frame)))
+        session.append((offset, getMessage(CCD_DEVICE, '[INFO] Exposure done, downloading image...', offset)))
+    return session
+
+def getFocuserSession(rate=20, steps=5000, speed=500):
+    """Move focuser out and back in reporting position at rate Hz"""
+    session = [(0, xml) for xml in getDevice(FOCUSER_DEVICE, FOCUSER_INTERFACE)]
+    session.append((0, defVector('Number', FOCUSER_DEVICE, 'ABS_FOCUS_POSITION', 'Absolute Position', 'Main Control', [
+        getNumber('FOCUS_ABSOLUTE_POSITION', 'Steps', 30000, 0, 100000, '%5.0f')
+    ])))
+    session.append((0, defVector('Number', FOCUSER_DEVICE, 'FOCUS_TEMPERATURE', 'Temperature', 'Main Control', [
+        getNumber('TEMPERATURE', 'Celsius', 8.5, -50, 70, '%6.2f')
+    ], perm='ro')))
+
+    offset = 0
+    for target in (30000 + steps, 30000):
+        session.append((offset, getMessage(FOCUSER_DEVICE, '[INFO] Focuser is moving to position %d' % target, offset)))
+        count = int(rate * steps / speed)
+        start = 30000 + steps - target
+        for i in range(1, count + 1):
+            offset += 1.0 / rate
+            position = start + (target - start) * i / count
+            session.append((offset, setVector('Number', FOCUSER_DEVICE, 'ABS_FOCUS_POSITION', {'FOCUS_ABSOLUTE_POSITION': round(position)}, 'Busy' if i < count else 'Ok', offset)))
+            if i % rate == 0:
+                session.append((offset, setVector('Number', FOCUSER_DEVICE, 'FOCUS_TEMPERATURE', {'TEMPERATURE': 8.5 - offset / 100}, 'Ok', offset)))
+    return session
+
+SESSIONS = {
+    'mount': getMountSession,
+    'ccd': getCcdSession,
+    'focuser': getFocuserSession
+}
+
+def loadSession(name):
+    """Return [(offset in seconds, xml)] of a built-in or recorded session"""
+    if name in SESSIONS:
+        return SESSIONS[name]()
+    with open(name) as f:
+        return [tuple(json.loads(line)) for line in f if line.strip()]
+
+def getSession(names):
+    """Merge sessions in order of their offsets"""
+    return list(heapq.merge(*[loadSession(name) for name in names], key=lambda item: item[0]))
+
+def recordSession(path, host='127.0.0.1', port=7624, duration=DURATION):
+    """Record everything an INDI server sends for duration seconds"""
+    connection = socket.create_connection((host, port))
+    connection.sendall(b"<getProperties version='1.7'/>\n")
+    connection.settimeout(0.5)
+    start = time.time()
+    chunks = 0
+
+    with open(path, 'w') as f:
+        while time.time() - start < duration:
+            try:
+                data = connection.recv(65536)
+            except socket.timeout:
+                continue
+            if not data:
+                break
+            f.write(json.dumps([round(time.time() - start, 3), data.decode('utf-8', 'replace')]) + '\n')
+            chunks += 1
+
+    connection.close()
+    return chunks
+
+class ReplayHandler(socketserver.BaseRequestHandler):
+    def handle(self):
+        requested = threading.Event()
+        reader = threading.Thread(target=self.read, args=(requested,), daemon=True)
+        reader.start()
+
+        if not requested.wait(10):
+            return
+
+        session = self.server.session
+        length = session[-1][0] if session else 0
+        start = time.time()
+        cycle = 0
+        sent = 0
+
+        try:
+            while True:
+                for offset, xml in session:
+                    if cycle and xml.startswith('<def'):
+                        continue # definitions are sent once
+                    if self.server.speed > 0:
+                        delay = start + (cycle * length + offset) / self.server.speed - time.time()
+                        if delay > 0:
+                            time.sleep(delay)
+                    self.request.sendall(xml.encode('utf-8') + b'\n')
+                    sent += 1
+                cycle += 1
+                if not self.server.loop:
+                    break
+        except OSError:
+            pass
+
+        print("Replayed %d elements to %s:%d in %.2fs" % (sent, self.client_address[0], self.client_address[1], time.time() - start))
+
+    def read(self, requested):
+        """Discard whatever client sends, session starts with its getProperties"""
+        try:
+            while True:
+                data = self.request.recv(4096)
+                if not data:
+                    break
+                if b'getProperties' in data:
+                    requested.set()
+        except OSError:
+            pass
+
+class ReplayServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, session, port=INDI_PORT, speed=SPEED, loop=False):
+        socketserver.ThreadingTCPServer.__init__(self, ('127.0.0.1', port), ReplayHandler)
+        self.session = session
+        self.speed = speed
+        self.loop = loop
+
+def getOption(name, default):
+    if name in sys.argv:
+        return sys.argv[sys.argv.index(name) + 1]
+    return default
+
+def main():
+    port = int(getOption('--port', INDI_PORT))
+
+    if '--record' in sys.argv:
+        path = getOption('--record', None)
+        host = getOption('--host', '127.0.0.1')
+        port = int(getOption('--port', 7624))
+        duration = float(getOption('--duration', DURATION))
+        print("Recording %s:%d for %ss to %s" % (host, port, duration, path))
+        print("Recorded %d chunks" % recordSession(path, host, port, duration))
+        return
+
+    names = []
+    args = iter(sys.argv[1:])
+    for arg in args:
+        if arg in ('--port', '--speed'):
+            next(args)
+        elif not arg.startswith('--'):
+            names.append(arg)
+
+    session = getSession(names or list(SESSIONS))
+    server = ReplayServer(session, port, float(getOption('--speed', SPEED)), '--loop' in sys.argv)
+    print("Replaying %d elements of %s on port %d" % (len(session), ', '.join(names or SESSIONS), port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == "__main__":
+    main()
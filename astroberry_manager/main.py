@@ -32,13 +32,19 @@ monkey.patch_all()
 
 from threading import Event
 from flask import Flask, render_template, redirect, url_for, request, session, send_file, make_response
-from flask_socketio import SocketIO
+from flask_socketio import SocketIO, join_room, leave_room
 
 from .time import getTime
 from .location import getLocation
 from .weather import getWeather
-from .almanac import getAlmanac
-from .equipment import getEquipment, setEquipment
+from .almanac import getAlmanac, getAlmanacReports, getAlmanacRooms, setAlmanacSite, removeAlmanacSite, getAlmanacCurve, getAlmanacCurveOnce
+from .polar import getPolarReports
+from .planner import getPlanner, getPlannerOnce
+from .coordinates import getTargets, getHorizon, saveHorizon
+from .ephemeris import getCalendar
+from .workers import startWorkers, POOL_SIZE
+from .equipment import getEquipment, setEquipment, resyncEquipment, emitEquipmentSnapshot, emitMessages, setBlobs, unsubscribeBlobs, getBlobRoom
+from .equipment import subscribeEquipment, unsubscribeEquipment, getSubscriptionRoom
 from .system import getSystemReports, getSystemReportOnce, runSystemUpdate, runSystemBackup, runSystemRestore, runSystemRestart, runSystemShutdown, process_status, getCA
 
 __author__ = 'Radek Kaczorek'
@@ -71,6 +77,8 @@ timeThread = None
 locationThread = None
 terminalThread = None
 sysmonThread = None
+almanacThread = None
+polarThread = None
 equipmentThread = None
 
 # start/stop event for INDI client
@@ -124,11 +132,52 @@ def index():
         return render_template('index.html')
     return redirect(url_for('login'))
 
+@app.route('/almanac/curve')
+def almanac_curves():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    try:
+        curves = getAlmanacCurveOnce(request.args.get('time'), request.args.get('latitude', type=float), request.args.get('longitude', type=float), request.args.get('altitude', type=float))
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    if not curves:
+        return {}, 404
+    return curves
+
+@app.route('/almanac/calendar')
+def almanac_calendar():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    calendar = getCalendar(request.args.get('month'))
+    if not calendar:
+        return {}, 404
+    return calendar
+
+@app.route('/planner')
+def planner_targets():
+    if 'username' not in session:
+        return redirect(url_for('login'))
+    data = request.args.to_dict()
+    for key in ('latitude', 'longitude', 'altitude'):
+        if key in data:
+            data[key] = request.args.get(key, type=float)
+    try:
+        planner = getPlannerOnce(data)
+    except ValueError as e:
+        return {'error': str(e)}, 400
+    if not planner:
+        return {}, 404
+    return planner
+
 @socketio.on('connect')
 def connect():
     if 'username' in session:
         app.logger.info("Socket connected")
         getSystemReportOnce(socketio)
+        for filter in subscribeEquipment(request.sid, [{}]): # all equipment until client subscribes otherwise
+            join_room(getSubscriptionRoom(filter))
+        emitEquipmentSnapshot(socketio, request.sid)
+        emitMessages(socketio, {}, request.sid)
         return True
     else:
         app.logger.info("Socket connection rejected")
@@ -137,6 +186,9 @@ def connect():
 @socketio.on('disconnect')
 def disconnect():
     app.logger.info("Socket disconnected")
+    unsubscribeBlobs(request.sid)
+    unsubscribeEquipment(request.sid)
+    removeAlmanacSite(request.sid)
     return True
 
 @socketio.on('weather')
@@ -145,12 +197,83 @@ def weather(data):
 
 @socketio.on('almanac')
 def almanac(data):
-    getAlmanac(socketio, data["time"], data["latitude"], data["longitude"], data["altitude"])
+    room, previous = setAlmanacSite(request.sid, data["latitude"], data["longitude"], data["altitude"])
+    if previous:
+        leave_room(previous)
+    join_room(room)
+    getAlmanac(socketio, data["time"], data["latitude"], data["longitude"], data["altitude"], data.get("events"), request.sid)
+
+@socketio.on('almanac_curve')
+def almanac_curve(data):
+    getAlmanacCurve(socketio, data.get("time"), data.get("latitude"), data.get("longitude"), data.get("altitude"), request.sid)
+
+@socketio.on('almanac_calendar')
+def almanac_calendar_month(data):
+    calendar = getCalendar(data.get("month"))
+    if calendar:
+        socketio.emit('almanac_calendar', calendar, to=request.sid)
+
+@socketio.on('planner')
+def planner(data):
+    getPlanner(socketio, data, request.sid)
+
+@socketio.on('targets')
+def targets(data):
+    getTargets(socketio, data, request.sid)
+
+@socketio.on('horizon')
+def horizon(data):
+    if data.get("horizon") is not None:
+        try:
+            saveHorizon(data["horizon"])
+        except (OSError, TypeError, ValueError) as e:
+            app.logger.error("Saving horizon profile failed: %s" % e)
+    socketio.emit('horizon', getHorizon(), to=request.sid)
 
 @socketio.on('equipment')
 def equipment(data):
     setEquipment(data)
 
+@socketio.on('equipment_blob')
+def equipment_blob(data):
+    if data.get("enable", True):
+        join_room(getBlobRoom(data["device"]))
+    else:
+        leave_room(getBlobRoom(data["device"]))
+    setBlobs(data["device"], data.get("enable", True), request.sid)
+
+@socketio.on('equipment_messages')
+def equipment_messages(data):
+    emitMessages(socketio, data, request.sid)
+
+@socketio.on('equipment_subscribe')
+def equipment_subscribe(data):
+    try:
+        if data.get("replace"):
+            for room in unsubscribeEquipment(request.sid):
+                leave_room(room)
+        filters = subscribeEquipment(request.sid, data.get("filters") or [{}])
+    except (AttributeError, ValueError) as e:
+        app.logger.error("Equipment subscription failed: %s" % e)
+        return
+    for filter in filters:
+        join_room(getSubscriptionRoom(filter))
+    emitEquipmentSnapshot(socketio, request.sid, filters)
+
+@socketio.on('equipment_unsubscribe')
+def equipment_unsubscribe(data):
+    try:
+        rooms = unsubscribeEquipment(request.sid, data.get("filters"))
+    except (AttributeError, ValueError) as e:
+        app.logger.error("Equipment unsubscription failed: %s" % e)
+        return
+    for room in rooms:
+        leave_room(room)
+
+@socketio.on('equipment_resync')
+def equipment_resync(data):
+    resyncEquipment(socketio, data, request.sid)
+
 @socketio.on('system')
 def system(data):
     if "action" not in data:
@@ -209,7 +332,7 @@ def shut_down():
 def main():
     global app_addr, app_port
     global fd, child_pid
-    global timeThread, locationThread, terminalThread, sysmonThread, equipmentThread
+    global timeThread, locationThread, terminalThread, sysmonThread, almanacThread, polarThread, equipmentThread
 
     try:
         print("Astroberry Manager v"+__version__+"\n")
@@ -235,6 +358,17 @@ def main():
             print("Starting system services")
             sysmonThread = socketio.start_background_task(getSystemReports, socketio)
 
+        print("Starting ephemeris workers")
+        startWorkers(POOL_SIZE)
+
+        if almanacThread is None:
+            print("Starting almanac services")
+            almanacThread = socketio.start_background_task(getAlmanacReports, socketio)
+
+        if polarThread is None:
+            print("Starting polar alignment services")
+            polarThread = socketio.start_background_task(getPolarReports, socketio, getAlmanacRooms)
+
         if equipmentThread is None:
             print("Starting equipment services")
             equipmentThreadEvent.set() # call equipmentThreadEvent.clear() to terminate background thread
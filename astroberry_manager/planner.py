@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+import os, json, datetime, ephem, numpy
+from .almanac import AlmanacCache, TWILIGHTS, getObserver, getAlmanacSite, getNightStart, offloadAlmanac
+from .polar import getLST
+
+CATALOG = os.path.join(os.path.dirname(__file__), 'assets', 'js', 'd3-celestial', 'data', 'dsos.14.json')
+
+ALTITUDE_LIMIT = 30 # degrees, objects count as observable above it
+MOON_SEPARATION = 20 # degrees, default minimum distance from the Moon
+PLANNER_STEP = 10 # minutes between altitude samples
+PAGE_SIZE = 50
+PAGE_SIZE_MAX = 500
+
+SIDEREAL_RATE = 1.00273790935 # sidereal days per solar day
+
+catalog = None # DSO catalog as numpy arrays, loaded once
+plannerCache = AlmanacCache(size=4, bucket=None)
+
+def loadCatalog():
+    """Load DSO catalog into numpy arrays, coordinates are J2000 with RA stored as -180..180 degrees"""
+    global catalog
+
+    if catalog is None:
+        with open(CATALOG) as f:
+            features = json.load(f)['features']
+
+        ids, names, types, mags, dims, ra, dec = [], [], [], [], [], [], []
+        for feature in features:
+            properties = feature['properties']
+            coordinates = feature['geometry']['coordinates']
+            try:
+                mag = float(properties['mag'])
+            except ValueError:
+                mag = 999
+            ids.append(feature['id'])
+            names.append(properties['desig'])
+            types.append(properties['type'])
+            mags.append(mag if mag < 999 else numpy.nan)
+            dims.append(properties['dim'])
+            ra.append(coordinates[0] % 360)
+            dec.append(coordinates[1])
+
+        catalog = {
+            'id': numpy.array(ids),
+            'name': numpy.array(names),
+            'type': numpy.array(types),
+            'mag': numpy.array(mags),
+            'dim': numpy.array(dims),
+            'ra': numpy.radians(numpy.array(ra)),
+            'dec': numpy.radians(numpy.array(dec))
+        }
+
+    return catalog
+
+def getDarkness(home):
+    """
+    Return start and end of tonight's darkness, the coming night once dawn has passed
+    Astronomical darkness if the Sun gets deep enough, otherwise the darkest twilight available.
+    A Sun never rising above a twilight horizon makes the whole night dark.
+    """
+    start = getNightStart(home)
+    dusk, dawn = getNightDarkness(home, start)
+    if dawn is not None and dawn <= home.date:
+        dusk, dawn = getNightDarkness(home, ephem.Date(start + 1))
+    return dusk, dawn
+
+def getNightDarkness(home, start):
+    """Return darkness of the night starting at local noon given"""
+    observer = home.copy()
+    sun = ephem.Sun()
+
+    # upper limb of the Sun, as almanac twilights
+    for twi in reversed(TWILIGHTS):
+        observer.horizon = twi
+        try:
+            dusk = observer.next_setting(sun, start=start)
+            dawn = observer.next_rising(sun, start=dusk)
+            return dusk, dawn
+        except ephem.NeverUpError:
+            return start, ephem.Date(start + 1)
+        except ephem.AlwaysUpError:
+            continue
+
+    return None, None
+
+def computePlanner(home):
+    """
+    Compute observability of every DSO across tonight's darkness in one batched pass
+    Altitude is sampled on a time grid for all objects at once. Catalog positions are
+    used as they are, precession is negligible for planning.
+    Runs in a worker process, the payload holds plain values and numpy arrays only.
+    """
+    dsos = loadCatalog()
+    dusk, dawn = getDarkness(home)
+    if dusk is None:
+        # no darkness tonight, try again at next local noon
+        return {'dusk': None, 'dawn': None}, ephem.Date(getNightStart(home) + 1)
+
+    grid = numpy.arange(float(dusk), float(dawn), PLANNER_STEP / 1440.0)
+    lst = numpy.radians(getLST(grid, numpy.degrees(home.lon)))
+
+    lat = float(home.lat)
+    ra = dsos['ra'].astype(numpy.float32)
+    dec = dsos['dec'].astype(numpy.float32)
+
+    # sin(altitude) for every sample and object
+    ha = lst.astype(numpy.float32)[:, None] - ra[None, :]
+    sin_alt = numpy.sin(lat) * numpy.sin(dec)[None, :] + numpy.cos(lat) * numpy.cos(dec)[None, :] * numpy.cos(ha)
+
+    hours = numpy.count_nonzero(sin_alt > numpy.sin(numpy.radians(ALTITUDE_LIMIT)), axis=0) * PLANNER_STEP / 60.0
+    max_alt = numpy.degrees(numpy.arcsin(numpy.clip(sin_alt.max(axis=0), -1, 1)))
+
+    # next transit after dusk
+    transit = float(dusk) + ((dsos['ra'] - lst[0]) % (2 * numpy.pi)) / (2 * numpy.pi * SIDEREAL_RATE)
+
+    # Moon separation in the middle of the night
+    observer = home.copy()
+    observer.date = (dusk + dawn) / 2
+    moon = ephem.Moon(observer)
+    moon_dec = float(moon.a_dec)
+    cos_sep = numpy.sin(moon_dec) * numpy.sin(dsos['dec']) + numpy.cos(moon_dec) * numpy.cos(dsos['dec']) * numpy.cos(dsos['ra'] - float(moon.a_ra))
+    moon_sep = numpy.degrees(numpy.arccos(numpy.clip(cos_sep, -1, 1)))
+
+    planner = {
+        'dusk': dusk,
+        'dawn': dawn,
+        'moon_alt': numpy.degrees(moon.alt),
+        'hours': hours,
+        'max_alt': max_alt,
+        'transit': transit,
+        'moon_sep': moon_sep
+    }
+
+    return planner, ephem.Date(dawn)
+
+def getPlanner(socketio, data, to=None):
+    try:
+        planner = getPlannerOnce(data)
+    except ValueError:
+        return
+    if planner:
+        socketio.emit('planner', planner, to=to)
+
+def getPlannerOnce(data):
+    """
+    Return ranked, paginated list of DSOs observable tonight
+    data may hold time, latitude, longitude and altitude of the site (active site if not given),
+    moon (minimum Moon separation), mag (limiting magnitude), type, page and size.
+    Raises ValueError on invalid request.
+    """
+    page, size, mag, moon_separation = getPlannerRequest(data)
+
+    latitude, longitude, elevation = data.get('latitude'), data.get('longitude'), data.get('altitude')
+    if latitude is None or longitude is None:
+        site = getAlmanacSite()
+        if site is None:
+            return
+        latitude, longitude, elevation = site
+
+    gpstime = data.get('time')
+    if gpstime is None:
+        gpstime = datetime.datetime.now(datetime.timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.%f%z')
+
+    try:
+        home = getObserver(gpstime, float(latitude), float(longitude), float(elevation or 0))
+    except (TypeError, ValueError):
+        raise ValueError("Invalid planner site or time")
+    planner = plannerCache.get(home, offloadAlmanac(computePlanner))
+
+    result = {
+        'dusk': ephem.localtime(planner['dusk']).strftime("%Y-%m-%d %H:%M:%S") if planner['dusk'] else '-',
+        'dawn': ephem.localtime(planner['dawn']).strftime("%Y-%m-%d %H:%M:%S") if planner['dawn'] else '-',
+        'total': 0,
+        'page': 1,
+        'size': PAGE_SIZE,
+        'targets': []
+    }
+
+    if planner['dusk'] is None:
+        return result
+
+    dsos = loadCatalog()
+
+    # filter, Moon separation matters only with the Moon up
+    selected = planner['hours'] > 0
+    if moon_separation and planner['moon_alt'] > 0:
+        selected &= planner['moon_sep'] >= moon_separation
+    if mag is not None:
+        selected &= dsos['mag'] <= mag
+    if data.get('type'):
+        selected &= dsos['type'] == data['type']
+
+    # rank by time above limit, then by highest altitude reached
+    index = numpy.flatnonzero(selected)
+    index = index[numpy.lexsort((-planner['max_alt'][index], -planner['hours'][index]))]
+
+    result.update({'total': len(index), 'page': page, 'size': size})
+
+    for i in index[(page - 1) * size:page * size]:
+        result['targets'].append({
+            'id': str(dsos['id'][i]),
+            'name': str(dsos['name'][i]),
+            'type': str(dsos['type'][i]),
+            'mag': None if numpy.isnan(dsos['mag'][i]) else float(dsos['mag'][i]),
+            'dim': str(dsos['dim'][i]),
+            'ra': "%.2f" % numpy.degrees(dsos['ra'][i]),
+            'dec': "%.2f" % numpy.degrees(dsos['dec'][i]),
+            'transit': ephem.localtime(ephem.Date(planner['transit'][i])).strftime("%H:%M:%S"),
+            'max_alt': "%.2f°" % planner['max_alt'][i],
+            'hours': "%.1f" % planner['hours'][i],
+            'moon_sep': "%.2f°" % planner['moon_sep'][i]
+        })
+
+    return result
+
+def getPlannerRequest(data):
+    """Return page, size, limiting magnitude and Moon separation of a planner request, ValueError if invalid"""
+    try:
+        page = int(data.get('page') or 1)
+        size = int(data.get('size') or PAGE_SIZE)
+        mag = float(data['mag']) if data.get('mag') not in (None, '') else None
+        moon_separation = float(data.get('moon', MOON_SEPARATION) or 0)
+    except (TypeError, ValueError):
+        raise ValueError("Invalid planner page, size, mag or moon")
+
+    if page < 1 or not 1 <= size <= PAGE_SIZE_MAX or not numpy.isfinite(moon_separation) or (mag is not None and not numpy.isfinite(mag)):
+        raise ValueError("Invalid planner page, size, mag or moon")
+
+    return page, size, mag, moon_separation
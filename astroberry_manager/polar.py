@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+import time, ephem, numpy
+
+POLLING = 1 # seconds between hour angle updates
+
+# Polaris is built once and never computed for an observer, hour angle uses its catalog (J2000) right ascension
+POLARIS = ephem.readdb("Polaris,f|M|F7,2:31:49.095,89:15:50.79,2.02,2000")
+POLARIS.compute()
+POLARIS_RA = numpy.rad2deg(float(POLARIS._ra))
+
+J2000 = float(ephem.Date('2000/01/01 12:00:00'))
+
+def getPolarReports(socketio, getRooms):
+    """Send hour angle to clients of every site, getRooms returns (site, room) of sites with clients"""
+    while True:
+        date = ephem.now()
+        for site, room in getRooms():
+            emitPolarData(socketio, date, site[1], room)
+        time.sleep(POLLING)
+
+def emitPolarData(socketio, date, longitude, to):
+    if socketio:
+        socketio.emit('polaris', {
+            'polaris_hour_angle': "%.2f" % getHourAngle(date, longitude, POLARIS_RA)
+        }, to=to)
+
+def getLST(date, longitude):
+    """
+    lst = 100.46 + 0.985647 * d + lon + 15 * ut [based on http://www.stargazing.net/kepler/altaz.html]
+    d - the days from J2000 (1200 hrs UT on Jan 1st 2000 AD), including the fraction of a day
+    lon - your longitude in decimal degrees, East positive
+    ut - the universal time in decimal hours, ephem dates start at noon
+    Works on a single date or an array of dates, shared by all sidereal time users.
+    """
+    date = numpy.asarray(date, dtype=float)
+    d = date - J2000
+    ut = (date + 0.5) % 1 * 24
+    return (100.46 + 0.985647 * d + longitude + 15 * ut) % 360
+
+def getHourAngle(date, longitude, ra):
+    # hour angle = LST - RA [expressed in degrees or 15*(h+m/60+s/3600)]
+    return (getLST(date, longitude) - ra) % 360
+
+def getPolarisHourAngle(observer):
+    return getHourAngle(observer.date, numpy.rad2deg(float(observer.lon)), POLARIS_RA)
+
+def getPolarisNextTransit(observer):
+    # searching computes the body for the observer, keep the shared one untouched
+    try:
+        return observer.next_transit(POLARIS.copy())
+    except (ephem.NeverUpError, ephem.AlwaysUpError):
+        return None
+
+def getPolarisData(observer):
+    polaris_data = []
+
+    # append polaris hour angle
+    polaris_data.append(getPolarisHourAngle(observer))
+
+    # append polaris next transit
+    pnt = getPolarisNextTransit(observer)
+    if pnt:
+        polaris_data.append(ephem.localtime(pnt).strftime("%H:%M:%S"))
+    else:
+        polaris_data.append('-')
+
+    return polaris_data
@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Previews of camera frames
+
+FITS frames are binned down to PREVIEW_SIZE, stretched with a midtones transfer function
+and encoded as 8-bit PNG. JPEG and PNG frames are passed as they are. Runs in worker
+processes, so it must not depend on PyIndi.
+"""
+
+import os, mmap, zlib, struct, numpy
+
+PREVIEW_SIZE = 800 # maximum width or height of previews in pixels
+PREVIEW_BACKGROUND = 0.25 # target median of stretched previews
+PREVIEW_CLIP = -2.8 # shadows clipping point in MADs from median
+
+FITS_BLOCK = 2880
+FITS_TYPES = {8: 'u1', 16: '>i2', 32: '>i4', 64: '>i8', -32: '>f4', -64: '>f8'}
+
+def getPreview(data, format):
+    """Return (image, format, width, height) of a frame, None if format is not supported"""
+    format = format.lower()
+
+    if format in ('.jpg', '.jpeg', '.png'):
+        return bytes(data), format.lstrip('.'), None, None
+
+    if format not in ('.fits', '.fit', '.fts'):
+        return
+
+    image = readFITS(data)
+    if image is None:
+        return
+
+    image = stretchImage(binImage(image, PREVIEW_SIZE))
+    return getPNG(image), 'png', image.shape[1], image.shape[0]
+
+def getPreviewFile(path, format):
+    """Return preview of a frame stored in a file, the file is removed"""
+    try:
+        with open(path, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            return getPreview(data, format)
+        finally:
+            data.close()
+    finally:
+        os.remove(path)
+
+def readFITS(data):
+    """Return first image of a FITS file as float32 array without copying the data"""
+    data = memoryview(data)
+    header = {}
+    offset = 0
+
+    while offset + FITS_BLOCK <= len(data):
+        block = bytes(data[offset:offset + FITS_BLOCK]).decode('ascii', 'replace')
+        offset += FITS_BLOCK
+        for i in range(0, FITS_BLOCK, 80):
+            card = block[i:i + 80]
+            key = card[:8].strip()
+            if key == 'END':
+                break
+            if card[8:10] == '= ':
+                header[key] = card[10:].split('/')[0].strip().strip("'").strip()
+        else:
+            continue
+        break
+
+    try:
+        bitpix = int(header['BITPIX'])
+        width = int(header['NAXIS1'])
+        height = int(header['NAXIS2'])
+        planes = int(header.get('NAXIS3', 1)) if int(header['NAXIS']) > 2 else 1
+        dtype = numpy.dtype(FITS_TYPES[bitpix])
+    except (KeyError, ValueError):
+        return
+
+    if offset + width * height * planes * dtype.itemsize > len(data):
+        return
+
+    image = numpy.frombuffer(data, dtype=dtype, count=width * height * planes, offset=offset).reshape(planes, height, width)
+    image = image.mean(axis=0, dtype=numpy.float32) if planes > 1 else image[0].astype(numpy.float32)
+
+    return image * float(header.get('BSCALE', 1)) + float(header.get('BZERO', 0))
+
+def binImage(image, size):
+    """Average pixels in blocks so that neither side exceeds size"""
+    factor = -(-max(image.shape) // size)
+    if factor <= 1:
+        return image
+
+    height = image.shape[0] // factor * factor
+    width = image.shape[1] // factor * factor
+    return image[:height, :width].reshape(height // factor, factor, width // factor, factor).mean(axis=(1, 3))
+
+def stretchImage(image):
+    """Return 8-bit image with shadows clipped and median moved to PREVIEW_BACKGROUND"""
+    low, high = float(image.min()), float(image.max())
+    if high <= low:
+        return numpy.zeros(image.shape, dtype=numpy.uint8)
+
+    image = (image - low) / (high - low)
+    median = float(numpy.median(image))
+    mad = float(numpy.median(numpy.abs(image - median))) * 1.4826
+
+    shadows = min(max(median + PREVIEW_CLIP * mad, 0.0), median)
+    image = numpy.clip((image - shadows) / (1.0 - shadows), 0.0, 1.0)
+    midtones = getMTF(PREVIEW_BACKGROUND, (median - shadows) / (1.0 - shadows))
+
+    return (getMTF(midtones, image) * 255 + 0.5).astype(numpy.uint8)
+
+def getMTF(m, x):
+    """Midtones transfer function, maps m to 0.5"""
+    if m <= 0 or m >= 1:
+        return x
+    return (m - 1) * x / ((2 * m - 1) * x - m)
+
+def getPNG(image):
+    """Encode 8-bit grayscale image as PNG"""
+    height, width = image.shape
+    rows = numpy.empty((height, width + 1), dtype=numpy.uint8)
+    rows[:, 0] = 0 # no filter
+    rows[:, 1:] = image
+
+    def chunk(kind, data):
+        return struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data))
+
+    return b'\x89PNG\r\n\x1a\n' + \
+        chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 0, 0, 0, 0)) + \
+        chunk(b'IDAT', zlib.compress(rows.tobytes(), 6)) + \
+        chunk(b'IEND', b'')
@@ -24,43 +24,108 @@ Boston, MA 02110-1301, USA.
 """
 
 import os, psutil, shutil, time, subprocess, requests
+from .workers import getWorkerStats
+from .almanac import getCacheStats
+from .planner import plannerCache
+from .equipment import getEquipmentStats, getBridgeStats
 
 POLLING = 60
 
+RELEASE_PATH = '/etc/astroberry/version'
+OS_RELEASE_PATH = '/etc/os-release'
+DPKG_STATUS_PATH = '/var/lib/dpkg/status'
+
+# installed package -> release info key
+PACKAGES = {
+    'libindi1': 'indi_version',
+    'kstars-bleeding': 'kstars_version',
+    'phd2': 'phd2_version'
+}
+
+release_info = None # [mtimes of release files, release info]
+
+CPU_SAMPLE = 1 # seconds, shortest interval CPU usage is measured over
+cpu_sample = [time.time(), None] # time and CPU usage of last sample
+
+# first non-blocking call only stores CPU times
+psutil.cpu_percent(percpu=True, interval=None)
+psutil.cpu_percent(interval=None)
+
 def get_release_info():
+    """Return release info, read again only when version files or installed packages change"""
+    global release_info
+
+    mtimes = tuple(get_mtime(path) for path in (RELEASE_PATH, OS_RELEASE_PATH, DPKG_STATUS_PATH))
+    if release_info is None or release_info[0] != mtimes:
+        release_info = [mtimes, read_release_info()]
+
+    return dict(release_info[1])
+
+def read_release_info():
     from .main import __version__
     ui_version = __version__
 
-    path = '/etc/astroberry/version'
-    if os.path.exists(path):
-        with open(path) as f:
+    if os.path.exists(RELEASE_PATH):
+        with open(RELEASE_PATH) as f:
             osv = f.read()
             os_version = "Astroberry OS " + osv
     else:
-        os_version = os.popen("grep PRETTY_NAME /etc/os-release | cut -d= -f2").read().replace("\"","").strip()
+        os_version = get_os_release().get('PRETTY_NAME', 'unknown')
 
-    if os.popen("dpkg -l | grep libindi1").read():
-        indi_version = os.popen("dpkg -s libindi1|grep Version: | cut -d' '  -f2 | cut -d+ -f1").read().strip()
-    else:
-        indi_version = "unknown"
+    info = {
+        "ui_version": ui_version,
+        "os_version": os_version
+    }
 
-    if os.popen("dpkg -l | grep kstars-bleeding").read():
-        kstars_version = os.popen("dpkg -s kstars-bleeding|grep Version: | cut -d' '  -f2 | cut -d+ -f1").read().strip()
-    else:
-        kstars_version = "unknown"
+    versions = get_package_versions(PACKAGES)
+    for package, key in PACKAGES.items():
+        info[key] = versions.get(package, "unknown")
 
-    if os.popen("dpkg -l | grep phd2").read():
-        phd2_version = os.popen("dpkg -s phd2|grep Version: | cut -d' '  -f2 | cut -d+ -f1").read().strip()
-    else:
-        phd2_version = "unknown"
+    return info
 
-    return {
-        "ui_version": ui_version,
-        "os_version": os_version,
-        "indi_version": indi_version,
-        "kstars_version": kstars_version,
-        "phd2_version": phd2_version
-    }
+def get_mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+def get_os_release():
+    info = {}
+    try:
+        with open(OS_RELEASE_PATH) as f:
+            for line in f:
+                key, sep, value = line.strip().partition('=')
+                if sep:
+                    info[key] = value.strip('"\'')
+    except OSError:
+        pass
+    return info
+
+def get_package_versions(packages):
+    """Return upstream versions of installed packages, parsing dpkg status file in one pass"""
+    versions = {}
+    package = status = version = None
+
+    try:
+        with open(DPKG_STATUS_PATH, encoding='utf-8', errors='replace') as f:
+            for line in f:
+                if line.startswith('Package:'):
+                    package = line[8:].strip()
+                elif line.startswith('Status:'):
+                    status = line[7:].split()
+                elif line.startswith('Version:'):
+                    version = line[8:].strip()
+                elif not line.strip():
+                    if package in packages and status and status[-1] == 'installed' and version:
+                        versions[package] = version.split('+')[0]
+                    package = status = version = None
+    except OSError:
+        return versions
+
+    if package in packages and status and status[-1] == 'installed' and version:
+        versions[package] = version.split('+')[0] # last stanza without trailing blank line
+
+    return versions
 
 def get_kernel_info():
     return {
@@ -79,14 +144,26 @@ def get_memory_info():
     }
 
 def get_cpu_info():
+    cpu_usage_per_core, total_cpu_usage = get_cpu_usage()
     return {
         "physical_cores": psutil.cpu_count(logical=False),
         "total_cores": psutil.cpu_count(logical=True),
         "processor_speed": psutil.cpu_freq().current,
-        "cpu_usage_per_core": dict(enumerate(psutil.cpu_percent(percpu=True, interval=1))),
-        "total_cpu_usage": psutil.cpu_percent(interval=1)
+        "cpu_usage_per_core": dict(enumerate(cpu_usage_per_core)),
+        "total_cpu_usage": total_cpu_usage
     }
 
+def get_cpu_usage():
+    """
+    Return CPU usage per core and total since previous sample without blocking
+    psutil keeps CPU times of previous call, reports closer than CPU_SAMPLE get previous sample.
+    """
+    now = time.time()
+    if cpu_sample[1] is None or now - cpu_sample[0] >= CPU_SAMPLE:
+        cpu_sample[0] = now
+        cpu_sample[1] = (psutil.cpu_percent(percpu=True, interval=None), psutil.cpu_percent(interval=None))
+    return cpu_sample[1]
+
 def get_disk_info():
     partitions = psutil.disk_partitions()
     disk_info = {}
@@ -173,6 +250,14 @@ def get_model_info():
             return {"version": model}
     return {"version": "unknown"}
 
+def get_manager_info():
+    return {
+        "workers": getWorkerStats(),
+        "caches": dict(getCacheStats(), planner=plannerCache.stats()),
+        "equipment": getEquipmentStats(),
+        "bridge": getBridgeStats()
+    }
+
 def getSystemReports(socketio):
     while True:
         getSystemReportOnce(socketio)
@@ -192,6 +277,7 @@ def getSystemReportOnce(socketio):
         #"disk_io_counters": get_disk_io_counters(),
         #"net_io_counters": get_net_io_counters(),
         "model_info": get_model_info(),
+        "manager_info": get_manager_info(),
     }
     socketio.emit('system', data)
     #print("System data published")
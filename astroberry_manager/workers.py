@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Worker processes for ephemeris computation
+
+ephem runs in C and never yields to the gevent hub, so long computations are run in
+a bounded pool of worker processes. Jobs return futures, waiting for the result suspends
+the calling greenlet only. Pool size of zero runs jobs inline.
+Job functions and their arguments must be picklable, i.e. module level functions and
+plain values.
+"""
+
+import time, logging, multiprocessing
+from threading import Lock, BoundedSemaphore
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+POOL_SIZE = 2 # worker processes, 0 to run jobs inline
+QUEUE_SIZE = 16 # jobs submitted and not finished yet, submitting more waits
+PRELOAD = ['astroberry_manager.ephemeris', 'astroberry_manager.almanac', 'astroberry_manager.planner', 'astroberry_manager.preview'] # job modules
+
+logger = logging.getLogger(__name__)
+
+pool = None
+poolSize = POOL_SIZE
+poolLock = Lock()
+poolSlots = BoundedSemaphore(QUEUE_SIZE)
+
+stats = {
+    'jobs': 0,
+    'inline': 0,
+    'failed': 0,
+    'queued': 0,
+    'max_queued': 0,
+    'wait': 0.0,
+    'wait_max': 0.0,
+    'run': 0.0,
+    'run_max': 0.0
+}
+
+def startWorkers(size=POOL_SIZE):
+    """Start worker pool, size of zero runs all jobs inline"""
+    global pool, poolSize
+
+    with poolLock:
+        if pool is not None:
+            pool.shutdown(wait=False)
+            pool = None
+        poolSize = size
+        if size > 0:
+            # workers fork from a fresh server process preloading the job modules only, so they
+            # get no monkey patching, Flask app or INDI client. The entry script is still
+            # imported on worker start and must not import main.py, see run() in __main__.py
+            context = multiprocessing.get_context('forkserver')
+            context.set_forkserver_preload(PRELOAD)
+            pool = ProcessPoolExecutor(max_workers=size, mp_context=context)
+
+def stopWorkers():
+    startWorkers(0)
+
+def restartWorkers(broken):
+    """Replace broken pool with a new one of the same size, unless replaced already"""
+    with poolLock:
+        if pool is not broken:
+            return
+    startWorkers(poolSize)
+
+def runTimed(fn, args):
+    started = time.time()
+    result = fn(*args)
+    return result, started, time.time()
+
+def submitJob(fn, *args):
+    """Submit job to the pool, returns future of its result"""
+    poolSlots.acquire()
+    submitted = time.time()
+
+    with poolLock:
+        stats['queued'] += 1
+        stats['max_queued'] = max(stats['max_queued'], stats['queued'])
+        executor = pool
+
+    if executor is not None:
+        try:
+            job = executor.submit(runTimed, fn, args)
+        except (BrokenProcessPool, RuntimeError) as e:
+            logger.error("Ephemeris workers failed, running job inline: %s" % e)
+            restartWorkers(executor) # replace broken pool for next jobs
+            executor = None
+
+    if executor is None:
+        job = Future()
+        try:
+            job.set_result(runTimed(fn, args))
+        except Exception as e:
+            job.set_exception(e)
+
+    result = Future()
+
+    def done(job):
+        with poolLock:
+            stats['queued'] -= 1
+            stats['jobs'] += 1
+            if executor is None:
+                stats['inline'] += 1
+        poolSlots.release()
+
+        try:
+            value, started, finished = job.result()
+        except Exception as e:
+            with poolLock:
+                stats['failed'] += 1
+            if isinstance(e, BrokenProcessPool):
+                # worker died mid-job, replace the pool for next jobs
+                logger.error("Ephemeris worker died: %s" % e)
+                restartWorkers(executor)
+            result.set_exception(e)
+            return
+
+        with poolLock:
+            stats['wait'] += started - submitted
+            stats['wait_max'] = max(stats['wait_max'], started - submitted)
+            stats['run'] += finished - started
+            stats['run_max'] = max(stats['run_max'], finished - started)
+        result.set_result(value)
+
+    job.add_done_callback(done)
+    return result
+
+def runJob(fn, *args):
+    """Run job in the pool and wait for its result, inline if its worker died"""
+    try:
+        return submitJob(fn, *args).result()
+    except BrokenProcessPool:
+        with poolLock:
+            stats['inline'] += 1
+        return fn(*args)
+
+def getWorkerStats():
+    """Return pool size, queue depth and average/maximum latency in milliseconds"""
+    with poolLock:
+        jobs = max(stats['jobs'] - stats['failed'], 1)
+        return {
+            'size': poolSize,
+            'jobs': stats['jobs'],
+            'inline': stats['inline'],
+            'failed': stats['failed'],
+            'queued': stats['queued'],
+            'max_queued': stats['max_queued'],
+            'wait_avg': "%.2f" % (stats['wait'] / jobs * 1000),
+            'wait_max': "%.2f" % (stats['wait_max'] * 1000),
+            'run_avg': "%.2f" % (stats['run'] / jobs * 1000),
+            'run_max': "%.2f" % (stats['run_max'] * 1000)
+        }
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Almanac golden outputs, as emitted by getAlmanac before the almanac was cached and
+precomputed. Record again with python -m astroberry_manager.benchmark --record only
+for intended output changes.
+"""
+
+import json, ephem, numpy, pytest
+from astroberry_manager import almanac, ephemeris, benchmark
+
+with open(benchmark.GOLDEN) as f:
+    GOLDEN = json.load(f)
+
+def getGolden(key):
+    gpstime, latitude = key.split(' ')
+    home = almanac.getObserver(gpstime, float(latitude), benchmark.LONGITUDE, benchmark.ELEVATION)
+    data = almanac.computeAlmanac(home)
+    data.pop('almanac_events')
+    return data
+
+@pytest.mark.parametrize('key', sorted(GOLDEN))
+def test_golden(key):
+    assert getGolden(key) == GOLDEN[key]
+
+def test_golden_calendar(tmp_path, monkeypatch):
+    # calendar events start searching from local midnight and may round to another
+    # second than live searches at other sites, none does at this one
+    latitude = 52.2
+    path = str(tmp_path / 'ephemeris.npy')
+    ephemeris.saveCalendar(ephemeris.buildCalendar(latitude, benchmark.LONGITUDE, benchmark.ELEVATION, 2026), latitude, benchmark.LONGITUDE, benchmark.ELEVATION, path)
+    loadCalendar = ephemeris.loadCalendar
+    monkeypatch.setattr(ephemeris, 'calendar', None)
+    monkeypatch.setattr(ephemeris, 'loadCalendar', lambda: loadCalendar(path))
+
+    for gpstime in benchmark.TIMES:
+        key = "%s %s" % (gpstime, latitude)
+        home = almanac.getObserver(gpstime, latitude, benchmark.LONGITUDE, benchmark.ELEVATION)
+        assert ephemeris.fillSearches(home, {}) > 0
+        assert getGolden(key) == GOLDEN[key]
+
+def test_never_up():
+    # polar night
+    home = almanac.getObserver('2026-12-21T12:00:00.000Z', 89.0, benchmark.LONGITUDE, benchmark.ELEVATION)
+    sun = ephem.Sun(home)
+    with pytest.raises(ephem.NeverUpError):
+        home.next_rising(sun)
+
+    rise, transit, setting = almanac.getBodyPositions(home, sun)
+    assert (rise, setting) == ('-', '-')
+    assert transit == '10:34:02'
+    assert almanac.getSunTwilights(home, sun) == [('-', '-')] * 3
+
+def test_always_up():
+    # polar day
+    home = almanac.getObserver('2026-06-21T12:00:00.000Z', 89.0, benchmark.LONGITUDE, benchmark.ELEVATION)
+    sun = ephem.Sun(home)
+    with pytest.raises(ephem.AlwaysUpError):
+        home.next_rising(sun)
+
+    rise, transit, setting = almanac.getBodyPositions(home, sun)
+    assert (rise, setting) == ('-', '-')
+    assert transit == '10:37:48'
+    assert almanac.getSunTwilights(home, sun) == [('-', '-')] * 3
+
+def test_twilight_not_available(monkeypatch):
+    def alwaysUp(observer, body, searches=None):
+        raise ephem.AlwaysUpError()
+
+    monkeypatch.setattr(almanac, 'getBodyPositions', alwaysUp)
+    home = almanac.getObserver('2026-06-21T12:00:00.000Z', 66.6, benchmark.LONGITUDE, benchmark.ELEVATION)
+    assert almanac.getSunTwilights(home) == [('n/a', 'n/a')] * 3
+
+def test_reports_survive_failing_site(monkeypatch):
+    sites = [[1.0, 2.0, 3], [4.0, 5.0, 6]]
+    reported = []
+
+    def getAlmanacReportOnce(socketio, site):
+        reported.append(site)
+        if site == sites[0]:
+            raise RuntimeError("worker died")
+
+    def sleep(seconds):
+        raise StopIteration
+
+    monkeypatch.setattr(almanac, 'getAlmanacSites', lambda: sites)
+    monkeypatch.setattr(almanac, 'getAlmanacReportOnce', getAlmanacReportOnce)
+    monkeypatch.setattr(almanac.time, 'sleep', sleep)
+    with pytest.raises(StopIteration):
+        almanac.getAlmanacReports(None)
+    assert reported == sites
+
+def test_cache_stats(monkeypatch):
+    monkeypatch.setattr(almanac, 'positionsCache', almanac.AlmanacCache())
+    home = almanac.getObserver(benchmark.TIMES[0], 52.2, benchmark.LONGITUDE, benchmark.ELEVATION)
+    for i in range(3):
+        almanac.positionsCache.get(home, almanac.computeAlmanacPositions)
+    assert almanac.getCacheStats()['positions'] == {'entries': 1, 'hits': 2, 'misses': 1, 'waits': 0}
+
+@pytest.mark.parametrize('gpstime', ['tonight', '2026-13-40T25:00:00.000Z', 12])
+def test_curve_invalid_time(gpstime):
+    with pytest.raises(ValueError):
+        almanac.getAlmanacCurveOnce(gpstime, 52.2, 21.0, 100.0)
+
+def test_curve_refraction():
+    # refracted as ephem above the horizon, not refracted well below it
+    home = almanac.getObserver('2026-03-20T23:00:00.000Z', 52.2, benchmark.LONGITUDE, benchmark.ELEVATION)
+    curves, expires = almanac.computeAlmanacCurves(home)
+    start = almanac.getNightStart(home)
+    sun = ephem.Sun()
+    for i in range(len(curves['time'])):
+        home.date = start + i * curves['step'] / 1440.0
+        sun.compute(home)
+        alt = numpy.degrees(sun.alt)
+        if alt > 0 or alt < -10:
+            assert abs(curves['sun']['alt'][i] - alt) < 0.05
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Target coordinates against ephem
+"""
+
+import ephem, numpy, pytest
+from astroberry_manager import coordinates
+
+LATITUDES = [-60.0, -33.9, 0.0, 52.2, 70.0, 89.0]
+DATES = ['2000/01/01 12:00', '2010/06/15 03:00', '2026/03/20 23:00', '2035/12/21 18:00', '2045/07/04 00:00']
+LONGITUDE = 21.0
+
+# J2000 targets every 15 degrees of RA and 10 degrees of Dec
+RA, DEC = [grid.ravel() for grid in numpy.meshgrid(numpy.arange(0, 360, 15.0), numpy.arange(-85, 90, 10.0))]
+
+@pytest.mark.parametrize('latitude', LATITUDES)
+@pytest.mark.parametrize('date', DATES)
+def test_azalt(latitude, date):
+    az, alt = coordinates.getAzAlt(RA, DEC, latitude, LONGITUDE, 0, ephem.Date(date))
+
+    observer = ephem.Observer()
+    observer.lat = "%s" % latitude
+    observer.lon = "%s" % LONGITUDE
+    observer.date = date
+
+    body = ephem.FixedBody()
+    body._epoch = ephem.J2000
+    for i in range(len(RA)):
+        body._ra = numpy.radians(RA[i])
+        body._dec = numpy.radians(DEC[i])
+        body.compute(observer)
+        if body.alt < 0:
+            continue
+        separation = ephem.separation((numpy.radians(az[i]), numpy.radians(alt[i])), (body.az, body.alt))
+        assert numpy.degrees(separation) * 3600 < 45
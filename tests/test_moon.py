@@ -0,0 +1,61 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Moon phases and lunations every 11 hours over six years, recorded with the original
+getMoonPhase searching next and previous lunations of each phase
+"""
+
+import os, json, ephem, pytest
+from astroberry_manager import almanac
+
+with open(os.path.join(os.path.dirname(__file__), 'moon.json')) as f:
+    MOON = json.load(f)
+
+def getDates():
+    start = ephem.Date(MOON['start'])
+    for n in range(MOON['count']):
+        yield n, ephem.Date(start + n * MOON['step'] * ephem.hour)
+
+def test_moon_phase():
+    runs = MOON['phases'] + [[MOON['count'], None]]
+    run = 0
+    for n, date in getDates():
+        if n == runs[run + 1][0]:
+            run += 1
+        observer = ephem.Observer()
+        observer.date = date
+        assert (date, almanac.getMoonPhase(observer)) == (date, runs[run][1])
+
+@pytest.mark.parametrize('phase, key', [('New', 'new'), ('Full', 'full')])
+def test_next_lunation(phase, key):
+    lunations = iter(MOON[key])
+    expected = next(lunations)
+    for n, date in getDates():
+        lunation = ephem.localtime(almanac.getNextLunation(date, phase)).strftime("%Y-%m-%d %H:%M:%S")
+        if lunation != expected:
+            expected = next(lunations)
+        assert (date, lunation) == (date, expected)
+    assert next(lunations, None) is None
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Planner darkness and caching
+"""
+
+import ephem
+from astroberry_manager import almanac, planner
+
+LATITUDE = 52.2
+LONGITUDE = 21.0
+
+def getObserver(gpstime):
+    return almanac.getObserver(gpstime, LATITUDE, LONGITUDE, 100.0)
+
+def test_night_before_dawn():
+    home = getObserver('2026-03-21T01:00:00.000Z')
+    dusk, dawn = planner.getDarkness(home)
+    assert dusk < home.date < dawn
+
+def test_night_after_dawn():
+    # morning after dawn plans the coming night
+    home = getObserver('2026-03-21T08:00:00.000Z')
+    dusk, dawn = planner.getDarkness(home)
+    assert home.date < dusk < dawn
+    assert ephem.localtime(dusk).strftime("%Y-%m-%d") == '2026-03-21'
+
+def test_cache_after_dawn(monkeypatch):
+    monkeypatch.setattr(planner, 'plannerCache', almanac.AlmanacCache(size=4, bucket=None))
+    first = planner.getPlannerOnce({'time': '2026-03-21T08:00:00.000Z', 'latitude': LATITUDE, 'longitude': LONGITUDE})
+    second = planner.getPlannerOnce({'time': '2026-03-21T09:00:00.000Z', 'latitude': LATITUDE, 'longitude': LONGITUDE})
+    assert first == second
+    assert first['total'] > 0
+    assert planner.plannerCache.stats()['hits'] == 1
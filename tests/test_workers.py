@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+# coding=utf-8
+
+"""
+Copyright(c) 2026 Radek Kaczorek  <rkaczorek AT gmail DOT com>
+
+This library is part of Astroberry OS and Astroberry Manager
+https://github.com/astroberry-official/astroberry-os
+https://github.com/astroberry-official/astroberry-manager
+
+This library is free software; you can redistribute it and/or
+modify it under the terms of the GNU Library General Public
+License version 3 as published by the Free Software Foundation.
+
+This library is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+Library General Public License for more details.
+
+You should have received a copy of the GNU Library General Public License
+along with this library; see the file COPYING.LIB.  If not, write to
+the Free Software Foundation, Inc., 51 Franklin Street, Fifth Floor,
+Boston, MA 02110-1301, USA.
+"""
+
+"""
+Ephemeris worker pool
+"""
+
+import signal, pytest
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from astroberry_manager import workers
+
+@pytest.fixture
+def pool():
+    workers.startWorkers(1)
+    yield
+    workers.stopWorkers()
+
+def test_worker_died(pool):
+    broken = workers.pool
+    with pytest.raises(BrokenProcessPool):
+        workers.submitJob(signal.raise_signal, signal.SIGKILL).result()
+    assert workers.pool is not None and workers.pool is not broken
+    assert workers.runJob(pow, 2, 10) == 1024
+
+def test_rerun_inline(monkeypatch):
+    def submitJob(fn, *args):
+        job = Future()
+        job.set_exception(BrokenProcessPool("worker died"))
+        return job
+
+    monkeypatch.setattr(workers, 'submitJob', submitJob)
+    assert workers.runJob(pow, 2, 10) == 1024